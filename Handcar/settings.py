@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'Handcarapp',
     'corsheaders'
 ]
@@ -140,6 +141,40 @@ DATABASES = {
     }
 }
 
+# Cache
+# Shared Redis cache when REDIS_URL is set, so every worker sees the same catalog
+# and index versions. Catalog response caching, ETags and the vendor index and
+# autocomplete change journals all rely on that: with a per-process cache a write
+# only invalidates the worker that made it. The local-memory fallback is therefore
+# only allowed with DEBUG on (single-process development and tests); the app
+# refuses to start without a shared cache otherwise (HandcarappConfig.ready).
+
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'handcar',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'handcar',
+        }
+    }
+
+# Seconds a cached catalog response is kept; writes invalidate it sooner by
+# bumping the catalog version
+CATALOG_CACHE_TTL = config('CATALOG_CACHE_TTL', default=3600, cast=int)
+
+# Newest reviews embedded in a product_detail response; the rest are paged
+# through view_review
+PRODUCT_DETAIL_REVIEWS = config('PRODUCT_DETAIL_REVIEWS', default=10, cast=int)
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -211,3 +246,92 @@ cloudinary.config(
 )
 
 OPENCAGE_API_KEY = config('OPENCAGE_API_KEY')
+
+# Geocoding cache: lifetimes in seconds for found / not-found addresses, and the
+# number of addresses each worker keeps in memory in front of the database table
+GEOCODE_CACHE_TTL = config('GEOCODE_CACHE_TTL', default=90 * 24 * 60 * 60, cast=int)
+GEOCODE_NEGATIVE_CACHE_TTL = config('GEOCODE_NEGATIVE_CACHE_TTL', default=24 * 60 * 60, cast=int)
+GEOCODE_LRU_SIZE = config('GEOCODE_LRU_SIZE', default=2048, cast=int)
+
+# Seconds a worker keeps its in-memory vendor coordinate index before reloading
+VENDOR_INDEX_TTL = config('VENDOR_INDEX_TTL', default=300, cast=int)
+
+# Background geocoding: give up on an address after GEOCODE_MAX_ATTEMPTS OpenCage
+# failures (outages, rate limits, exhausted quota, rejected key), backing off
+# exponentially (in seconds) between attempts
+GEOCODE_MAX_ATTEMPTS = config('GEOCODE_MAX_ATTEMPTS', default=5, cast=int)
+GEOCODE_RETRY_BASE_DELAY = config('GEOCODE_RETRY_BASE_DELAY', default=30, cast=int)
+GEOCODE_RETRY_MAX_DELAY = config('GEOCODE_RETRY_MAX_DELAY', default=3600, cast=int)
+
+# Threads per worker process for work queued off the request path
+BACKGROUND_WORKERS = config('BACKGROUND_WORKERS', default=4, cast=int)
+
+# Outbound HTTP client (Handcarapp/http_client.py): timeouts and retry delays in
+# seconds, connection pool size and in-flight request cap per external host, and
+# the circuit breaker that fails fast after repeated errors from a host
+HTTP_CLIENT_CONNECT_TIMEOUT = config('HTTP_CLIENT_CONNECT_TIMEOUT', default=3.05, cast=float)
+HTTP_CLIENT_READ_TIMEOUT = config('HTTP_CLIENT_READ_TIMEOUT', default=10, cast=float)
+HTTP_CLIENT_MAX_RETRIES = config('HTTP_CLIENT_MAX_RETRIES', default=2, cast=int)
+HTTP_CLIENT_RETRY_BASE_DELAY = config('HTTP_CLIENT_RETRY_BASE_DELAY', default=0.5, cast=float)
+HTTP_CLIENT_RETRY_MAX_DELAY = config('HTTP_CLIENT_RETRY_MAX_DELAY', default=5, cast=float)
+HTTP_CLIENT_POOL_SIZE = config('HTTP_CLIENT_POOL_SIZE', default=10, cast=int)
+HTTP_CLIENT_HOST_CONCURRENCY = config('HTTP_CLIENT_HOST_CONCURRENCY', default=8, cast=int)
+HTTP_CIRCUIT_FAILURE_THRESHOLD = config('HTTP_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)
+HTTP_CIRCUIT_RESET_TIMEOUT = config('HTTP_CIRCUIT_RESET_TIMEOUT', default=30, cast=int)
+
+# Seconds an approximate total (view_products?with_total=1) is cached per filter set
+PAGINATION_COUNT_CACHE_TTL = config('PAGINATION_COUNT_CACHE_TTL', default=300, cast=int)
+# Largest page size (?limit=) the product listings accept
+PRODUCT_LIST_MAX_LIMIT = config('PRODUCT_LIST_MAX_LIMIT', default=100, cast=int)
+
+# Autocomplete prefix index: characters and leading words indexed per name (bounds
+# memory per item), journaled changes a worker can replay before rebuilding in
+# full, and seconds before a worker rebuilds regardless
+AUTOCOMPLETE_MAX_KEY_LENGTH = config('AUTOCOMPLETE_MAX_KEY_LENGTH', default=32, cast=int)
+AUTOCOMPLETE_MAX_WORDS = config('AUTOCOMPLETE_MAX_WORDS', default=4, cast=int)
+AUTOCOMPLETE_MAX_JOURNAL = config('AUTOCOMPLETE_MAX_JOURNAL', default=1000, cast=int)
+AUTOCOMPLETE_INDEX_TTL = config('AUTOCOMPLETE_INDEX_TTL', default=3600, cast=int)
+
+# Faceted product search: price band boundaries (the last band is open-ended) and
+# seconds facet counts are cached per filter set (catalog writes invalidate sooner)
+PRODUCT_PRICE_BANDS = [0, 100, 250, 500, 1000, 2500]
+FACET_CACHE_TTL = config('FACET_CACHE_TTL', default=300, cast=int)
+
+# Rows inserted per transaction by the bulk product import
+PRODUCT_IMPORT_CHUNK_SIZE = config('PRODUCT_IMPORT_CHUNK_SIZE', default=1000, cast=int)
+
+# Rows per UPDATE ... CASE statement in the bulk product patch endpoint
+PRODUCT_PATCH_BATCH_SIZE = config('PRODUCT_PATCH_BATCH_SIZE', default=1000, cast=int)
+
+# Background image uploads (Handcarapp/image_uploads.py): the storage backend
+# (LocalImageStorage copies files under IMAGE_UPLOAD_LOCAL_ROOT instead of
+# calling Cloudinary), where request files are spooled until uploaded, and the
+# retry policy; times in seconds. Uploads stuck in 'uploading' longer than
+# IMAGE_UPLOAD_STALE_AFTER are requeued by the process_image_uploads command.
+IMAGE_UPLOAD_STORAGE = config('IMAGE_UPLOAD_STORAGE', default='Handcarapp.image_uploads.CloudinaryImageStorage')
+IMAGE_UPLOAD_SPOOL_DIR = config('IMAGE_UPLOAD_SPOOL_DIR', default=str(BASE_DIR / 'upload_spool'))
+IMAGE_UPLOAD_LOCAL_ROOT = config('IMAGE_UPLOAD_LOCAL_ROOT', default=str(BASE_DIR / 'media'))
+IMAGE_UPLOAD_LOCAL_URL = config('IMAGE_UPLOAD_LOCAL_URL', default='/media/')
+IMAGE_UPLOAD_TIMEOUT = config('IMAGE_UPLOAD_TIMEOUT', default=60, cast=int)
+IMAGE_UPLOAD_MAX_ATTEMPTS = config('IMAGE_UPLOAD_MAX_ATTEMPTS', default=5, cast=int)
+IMAGE_UPLOAD_RETRY_BASE_DELAY = config('IMAGE_UPLOAD_RETRY_BASE_DELAY', default=10, cast=int)
+IMAGE_UPLOAD_RETRY_MAX_DELAY = config('IMAGE_UPLOAD_RETRY_MAX_DELAY', default=600, cast=int)
+IMAGE_UPLOAD_STALE_AFTER = config('IMAGE_UPLOAD_STALE_AFTER', default=900, cast=int)
+
+# Image preprocessing before upload (Handcarapp/image_processing.py): photos are
+# fit within IMAGE_MAX_DIMENSION pixels and re-encoded as IMAGE_OUTPUT_FORMAT
+# (WEBP or JPEG) at IMAGE_QUALITY with metadata stripped, in a pool of
+# IMAGE_PROCESS_WORKERS processes; IMAGE_PROCESS_TIMEOUT is in seconds
+IMAGE_MAX_DIMENSION = config('IMAGE_MAX_DIMENSION', default=2048, cast=int)
+IMAGE_OUTPUT_FORMAT = config('IMAGE_OUTPUT_FORMAT', default='WEBP')
+IMAGE_QUALITY = config('IMAGE_QUALITY', default=80, cast=int)
+IMAGE_PROCESS_WORKERS = config('IMAGE_PROCESS_WORKERS', default=2, cast=int)
+IMAGE_PROCESS_TIMEOUT = config('IMAGE_PROCESS_TIMEOUT', default=60, cast=int)
+
+# Seconds a client has between requesting direct-upload parameters
+# (image_upload_signature) and attaching the uploaded image
+DIRECT_UPLOAD_TOKEN_MAX_AGE = config('DIRECT_UPLOAD_TOKEN_MAX_AGE', default=3600, cast=int)
+
+# Widths in pixels of the thumb / medium / full image URLs listings return
+# (Handcarapp/image_variants.py); few buckets keep Cloudinary's derived images cached
+IMAGE_VARIANT_WIDTHS = {'thumb': 300, 'medium': 800, 'full': 1600}
@@ -1,5 +1,24 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Cache backends private to one process, or not caching at all
+UNSHARED_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
 
 class HandcarappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'Handcarapp'
\ No newline at end of file
+    name = 'Handcarapp'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Catalog versions, ETags and the vendor index and autocomplete change
+        # journals live in the cache; with one per worker, a write would only
+        # invalidate the worker that made it
+        if not settings.DEBUG and settings.CACHES['default']['BACKEND'] in UNSHARED_CACHE_BACKENDS:
+            raise ImproperlyConfigured(
+                "A cache shared by all workers is required when DEBUG is off; set REDIS_URL."
+            )
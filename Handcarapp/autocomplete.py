@@ -0,0 +1,223 @@
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .background import submit
+from .catalog_cache import catalog_version
+
+AUTOCOMPLETE = 'autocomplete'
+VERSION_CACHE_KEY = f'{AUTOCOMPLETE}:version'
+CHANGE_CACHE_KEY = 'autocomplete:change:{}'
+
+BRAND, CATEGORY, PRODUCT = 0, 1, 2
+KIND_NAMES = {BRAND: 'brand', CATEGORY: 'category', PRODUCT: 'product'}
+
+
+def normalize(text):
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+
+class AutocompleteIndex:
+    """
+    In-process prefix index over product, brand and category names for
+    typeahead. Each kind has its own sorted list of keys searched with
+    bisect, so a handful of brands can't be crowded out by thousands of
+    products sharing a prefix. Keys point at items through a parallel array
+    of packed ints (pk and whether the key is a mid-name word), so
+    memory stays at roughly one short string and 8 bytes per key.
+
+    Every name is indexed from its start and from the start of each of its
+    next few words, truncated to a fixed length, which bounds the keys per
+    item. Catalog writes append to a change journal in the shared cache;
+    each worker replays the journal on its next lookup and only falls back
+    to a full rebuild when it has missed too many changes. Full rebuilds run
+    on the background pool: lookups keep using the old index meanwhile, and
+    return nothing until a worker's first build finishes.
+    """
+
+    def __init__(self):
+        self.max_key_length = getattr(settings, 'AUTOCOMPLETE_MAX_KEY_LENGTH', 32)
+        self.max_words = getattr(settings, 'AUTOCOMPLETE_MAX_WORDS', 4)
+        self.max_journal = getattr(settings, 'AUTOCOMPLETE_MAX_JOURNAL', 1000)
+        self.ttl = getattr(settings, 'AUTOCOMPLETE_INDEX_TTL', 3600)
+        self._lock = threading.Lock()
+        self._tables = None
+        self._names = {}
+        self._version = None
+        self._loaded_at = 0.0
+        self._rebuilding = False
+
+    def _index_keys(self, name):
+        """[(key, is_word_match), ...] for a name."""
+        words = normalize(name).split(' ')
+        keys = []
+        for i in range(min(len(words), self.max_words)):
+            key = ' '.join(words[i:])[:self.max_key_length]
+            if key and all(key != existing for existing, _ in keys):
+                keys.append((key, i > 0))
+        return keys
+
+    def _fetch(self, kind, ids=None):
+        from .models import Brand, Category, Product
+        model = {BRAND: Brand, CATEGORY: Category, PRODUCT: Product}[kind]
+        queryset = model.objects.all()
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        return queryset.values_list('pk', 'name').iterator(chunk_size=5000)
+
+    def _rebuild(self):
+        try:
+            # Read before fetching, so changes made during the build are replayed after it
+            version = catalog_version(AUTOCOMPLETE)
+            tables, names = self._build()
+            with self._lock:
+                self._tables = tables
+                self._names = names
+                self._version = version
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def _build(self):
+        tables = {}
+        names = {}
+        for kind in (BRAND, CATEGORY, PRODUCT):
+            pairs = []
+            for pk, name in self._fetch(kind):
+                if not name:
+                    continue
+                names[(kind, pk)] = name
+                pairs.extend((key, pk << 1 | word) for key, word in self._index_keys(name))
+            pairs.sort()
+            tables[kind] = ([key for key, _ in pairs], array('q', (ref for _, ref in pairs)))
+        return tables, names
+
+    def _remove(self, kind, pk):
+        name = self._names.pop((kind, pk), None)
+        if name is None:
+            return
+        keys, refs = self._tables[kind]
+        for key, word in self._index_keys(name):
+            ref = pk << 1 | word
+            i = bisect_left(keys, key)
+            while i < len(keys) and keys[i] == key:
+                if refs[i] == ref:
+                    del keys[i]
+                    del refs[i]
+                    break
+                i += 1
+
+    def _insert(self, kind, pk, name):
+        self._names[(kind, pk)] = name
+        keys, refs = self._tables[kind]
+        for key, word in self._index_keys(name):
+            ref = pk << 1 | word
+            # Keep (key, ref) order so incremental updates and full rebuilds agree
+            i = bisect_left(keys, key)
+            while i < len(keys) and keys[i] == key and refs[i] < ref:
+                i += 1
+            keys.insert(i, key)
+            refs.insert(i, ref)
+
+    def _refresh(self, kind, ids):
+        for pk in ids:
+            self._remove(kind, pk)
+        for pk, name in self._fetch(kind, ids):
+            if name:
+                self._insert(kind, pk, name)
+
+    def _sync(self):
+        """Replay journaled changes, or start a background rebuild if they can't bring the index up to date."""
+        version = catalog_version(AUTOCOMPLETE)
+        with self._lock:
+            if self._catch_up(version) or self._rebuilding:
+                return
+            self._rebuilding = True
+        submit(self._rebuild)
+
+    def _catch_up(self, version):
+        """Bring the index up to version from the journal; False if that takes a full rebuild."""
+        expired = time.monotonic() - self._loaded_at > self.ttl
+        if version == self._version and not expired:
+            return True
+        missed = version - self._version if self._tables is not None else None
+        if missed is None or not 0 <= missed <= self.max_journal or expired:
+            return False
+
+        # A reseeded version is never journaled, so replaying across a reset
+        # finds an entry missing and rebuilds
+        journal_keys = [CHANGE_CACHE_KEY.format(seq) for seq in range(self._version + 1, version + 1)]
+        changes = cache.get_many(journal_keys)
+        if len(changes) != len(journal_keys):
+            return False
+        changed = {}
+        for kind, pk in changes.values():
+            changed.setdefault(kind, set()).add(pk)
+        for kind, ids in changed.items():
+            self._refresh(kind, ids)
+        self._version = version
+        return True
+
+    def record_change(self, kind, pk):
+        """Journal a catalog write so every worker refreshes that item on its next lookup."""
+        try:
+            seq = cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            # Evicted: reseed from the clock, so workers holding an older index rebuild in full
+            catalog_version(AUTOCOMPLETE)
+            return
+        cache.set(CHANGE_CACHE_KEY.format(seq), (kind, pk), timeout=max(self.ttl, 60))
+
+    def invalidate(self):
+        """Make every worker rebuild in full, for bulk writes too large to journal item by item."""
+        try:
+            cache.incr(VERSION_CACHE_KEY, self.max_journal + 1)
+        except ValueError:
+            catalog_version(AUTOCOMPLETE)
+
+    def suggest(self, text, limit=10):
+        """
+        Return up to `limit` suggestions whose name, or one of its words,
+        starts with text. Names that start with the text rank ahead of
+        mid-name matches, brands and categories ahead of products, then
+        shorter names first.
+        """
+        prefix = normalize(text)[:self.max_key_length]
+        if not prefix:
+            return []
+        self._sync()
+
+        scan_limit = max(limit * 10, 100)
+        candidates = {}
+        with self._lock:
+            for kind, (keys, refs) in (self._tables or {}).items():
+                start = i = bisect_left(keys, prefix)
+                while i < len(keys) and i - start < scan_limit and keys[i].startswith(prefix):
+                    ref = refs[i]
+                    item = (kind, ref >> 1)
+                    name = self._names[item]
+                    rank = (ref & 1, kind, len(name), name)
+                    if item not in candidates or rank < candidates[item]:
+                        candidates[item] = rank
+                    i += 1
+
+        best = sorted(candidates.items(), key=lambda candidate: candidate[1])[:limit]
+        return [
+            {'type': KIND_NAMES[kind], 'id': pk, 'name': rank[3]}
+            for (kind, pk), rank in best
+        ]
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def record_catalog_change(kind, pk):
+    # Journal only after commit so other workers never read uncommitted names
+    transaction.on_commit(lambda: autocomplete_index.record_change(kind, pk))
@@ -0,0 +1,50 @@
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide bounded thread pool for work that shouldn't block a request."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_WORKERS', 4),
+                thread_name_prefix='handcar-background',
+            )
+        return _executor
+
+
+def _run(func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(func, '__name__', func))
+    finally:
+        # Each pool thread opens its own connection; don't leave it dangling
+        connection.close()
+
+
+def submit(func, *args):
+    """Run func(*args) on the background pool now."""
+    get_executor().submit(_run, func, args)
+
+
+def submit_on_commit(func, *args):
+    """Run func(*args) on the background pool once the current transaction commits."""
+    transaction.on_commit(lambda: submit(func, *args))
+
+
+def backoff_delay(attempt, base, cap):
+    """Exponential backoff in seconds, jittered over its upper half, for a 1-based attempt."""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
@@ -0,0 +1,142 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+CATALOG = 'catalog'
+SERVICE_CATEGORY = 'service_category'
+
+
+def _initial_version(namespace):
+    # Seeded from the clock so a version lost to cache eviction never restarts
+    # at a number whose entries might still be cached
+    cache.add(f'{namespace}:version', int(time.time()), timeout=None)
+
+
+def catalog_version(namespace=CATALOG):
+    """Current data version of a namespace; every write to it moves it forward."""
+    version = cache.get(f'{namespace}:version')
+    if version is None:
+        _initial_version(namespace)
+        version = cache.get(f'{namespace}:version')
+    return version
+
+
+def catalog_last_modified(namespace=CATALOG):
+    """When the namespace was last written to, or None if unknown."""
+    timestamp = cache.get(f'{namespace}:modified')
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc) if timestamp else None
+
+
+def _bump(namespace):
+    cache.set(f'{namespace}:modified', int(time.time()), timeout=None)
+    try:
+        cache.incr(f'{namespace}:version')
+    except ValueError:
+        _initial_version(namespace)
+
+
+def bump_catalog_version(namespace=CATALOG):
+    """
+    Invalidate every cached response of a namespace. Entries are keyed by
+    version, so old ones are simply never read again and age out of the cache.
+    """
+    # Readers must not cache the old data under the new version
+    transaction.on_commit(lambda: _bump(namespace))
+
+
+def _normalized_query(request):
+    return urlencode(sorted((key, value) for key, values in request.GET.lists() for value in values))
+
+
+def conditional_catalog_response(namespace=CATALOG):
+    """
+    ETag / Last-Modified support for a read endpoint whose body only changes
+    when the namespace version does. The strong ETag is computed from the
+    version, path and query without running the view, so If-None-Match is
+    answered with 304 before the ORM is touched.
+    """
+    def etag(request, *args, **kwargs):
+        key = f'{namespace}:{catalog_version(namespace)}:{request.path}?{_normalized_query(request)}'
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        return catalog_last_modified(namespace)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+class CacheStats:
+    """Per-process hit/miss counters for each cached endpoint."""
+
+    def __init__(self):
+        self._hits = Counter()
+        self._misses = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name, hit):
+        with self._lock:
+            (self._hits if hit else self._misses)[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            names = sorted(set(self._hits) | set(self._misses))
+            stats = {}
+            for name in names:
+                hits, misses = self._hits[name], self._misses[name]
+                stats[name] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': round(hits / (hits + misses), 3),
+                }
+            return stats
+
+
+cache_stats = CacheStats()
+
+
+def _response_key(name, request):
+    digest = hashlib.md5(_normalized_query(request).encode('utf-8')).hexdigest()
+    return f'catalog:{catalog_version()}:{name}:{digest}'
+
+
+def cache_catalog_response(view):
+    """
+    Cache successful JSON GET responses of a catalog read view, keyed by the
+    view, its normalized query string and the catalog version. Place it above
+    @api_view so DRF has already built the response.
+    """
+    # @api_view returns a generic 'view' function; use the wrapped view's name
+    name = getattr(getattr(view, 'cls', None), '__name__', view.__name__)
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return view(request, *args, **kwargs)
+
+        key = _response_key(name, request)
+        cached = cache.get(key)
+        if cached is not None:
+            cache_stats.record(name, hit=True)
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        cache_stats.record(name, hit=False)
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        content_type = response.get('Content-Type', '')
+        if response.status_code == 200 and content_type.startswith('application/json'):
+            cache.set(key, (response.content, content_type), getattr(settings, 'CATALOG_CACHE_TTL', 3600))
+        return response
+
+    return wrapper
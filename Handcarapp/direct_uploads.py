@@ -0,0 +1,65 @@
+import re
+import time
+import uuid
+
+import cloudinary
+from cloudinary.utils import api_sign_request, cloudinary_url, verify_api_response_signature
+from django.conf import settings
+from django.core import signing
+
+from .image_uploads import attach_stored_image
+from .models import ImageUpload
+
+SIGNING_SALT = 'Handcarapp.direct_uploads'
+FOLDERS = {
+    ImageUpload.TARGET_PRODUCT: 'product_images/',
+    ImageUpload.TARGET_SERVICE: 'service_images/',
+}
+
+
+def signed_upload_params(target, target_id):
+    """
+    Parameters for a browser or app to upload one image straight to
+    Cloudinary, signed locally with the API secret. The public id is fixed by
+    the signature, and upload_token binds it to the target for attach_upload.
+    Cloudinary downscales the image on arrival, as preprocess_image would.
+    """
+    config = cloudinary.config()
+    public_id = FOLDERS[target] + uuid.uuid4().hex
+    max_dimension = getattr(settings, 'IMAGE_MAX_DIMENSION', 2048)
+    params = {
+        'public_id': public_id,
+        'timestamp': int(time.time()),
+        'transformation': f'c_limit,w_{max_dimension},h_{max_dimension}',
+    }
+    params['signature'] = api_sign_request(params, config.api_secret)
+    params['api_key'] = config.api_key
+    return {
+        'upload_url': f"https://api.cloudinary.com/v1_1/{config.cloud_name}/image/upload",
+        'params': params,
+        'upload_token': signing.dumps(
+            {'target': target, 'target_id': target_id, 'public_id': public_id}, salt=SIGNING_SALT),
+    }
+
+
+def attach_upload(upload_token, public_id, version, signature, image_format=None):
+    """
+    Attach an image the client uploaded with signed_upload_params. Checks that
+    the token is ours and recent, and that Cloudinary's response signature
+    matches the public id and version; no call to Cloudinary is made. Returns
+    the finished ImageUpload or raises ValueError.
+    """
+    try:
+        token = signing.loads(
+            upload_token, salt=SIGNING_SALT, max_age=getattr(settings, 'DIRECT_UPLOAD_TOKEN_MAX_AGE', 3600))
+    except signing.BadSignature:
+        raise ValueError("Invalid or expired upload token.")
+    if public_id != token['public_id']:
+        raise ValueError("public_id does not match the upload token.")
+    if not verify_api_response_signature(public_id, version, signature):
+        raise ValueError("Invalid upload signature.")
+    if image_format and not re.fullmatch(r'[a-z0-9]{2,5}', image_format):
+        raise ValueError("Invalid image format.")
+
+    url, _ = cloudinary_url(public_id, version=version, format=image_format or None, secure=True)
+    return attach_stored_image(token['target'], token['target_id'], FOLDERS[token['target']], url, public_id)
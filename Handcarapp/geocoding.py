@@ -0,0 +1,225 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .background import backoff_delay
+from .http_client import RETRYABLE_STATUSES, ExternalServiceError, http_client
+
+OPENCAGE_URL = 'https://api.opencagedata.com/geocode/v1/json'
+
+
+def normalize_address(address):
+    """Canonical form used as the cache key, so spacing, case and punctuation don't matter."""
+    address = unicodedata.normalize('NFKC', address).lower()
+    address = re.sub(r'[,.;:#/\\|()\-]+', ' ', address)
+    return ' '.join(address.split())
+
+
+def address_hash(address):
+    return hashlib.sha256(normalize_address(address).encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """Small thread-safe LRU with per-entry expiry, kept in front of the database cache."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_memory_cache = LRUCache(getattr(settings, 'GEOCODE_LRU_SIZE', 2048))
+
+
+def _opencage_lookup(address):
+    """
+    Query OpenCage. Returns (lat, lng), or (None, None) when the address has
+    no match. Raises ExternalServiceError when OpenCage is down, rate limiting
+    us or refusing the key (quota exhausted, 401/402/403), so background
+    geocoding retries later instead of giving up on the address.
+    """
+    response = http_client.get(OPENCAGE_URL, params={'q': address, 'key': settings.OPENCAGE_API_KEY})
+    if response.status_code in RETRYABLE_STATUSES:
+        raise ExternalServiceError(f"OpenCage returned {response.status_code}")
+    try:
+        body = response.json()
+    except ValueError:
+        raise ExternalServiceError(f"OpenCage returned {response.status_code} with an invalid body")
+    code = body.get('status', {}).get('code', response.status_code)
+    if response.status_code != 200 or code != 200:
+        message = body.get('status', {}).get('message', '')
+        raise ExternalServiceError(f"OpenCage returned {code} {message}".strip())
+    if body.get('results'):
+        geometry = body['results'][0]['geometry']
+        return geometry['lat'], geometry['lng']
+    return None, None
+
+
+def geocode_address(address):
+    """
+    Return (latitude, longitude) for an address, or (None, None) when it
+    has no match. Results are served from the in-process LRU, then the
+    GeocodeCache table, and only reach OpenCage on a miss. Misses are cached
+    too, for the shorter GEOCODE_NEGATIVE_CACHE_TTL. Raises
+    ExternalServiceError when OpenCage can't answer; nothing is cached then.
+    """
+    from .models import GeocodeCache
+
+    if not address or not address.strip():
+        return None, None
+
+    key = address_hash(address)
+    cached = _memory_cache.get(key)
+    if cached is not None:
+        return cached
+
+    entry = GeocodeCache.objects.filter(address_hash=key, expires_at__gt=timezone.now()).first()
+    if entry is not None:
+        coordinates = (entry.latitude, entry.longitude)
+        _memory_cache.set(key, coordinates, entry.expires_at.timestamp())
+        return coordinates
+
+    coordinates = _opencage_lookup(address)
+    found = coordinates[0] is not None and coordinates[1] is not None
+    ttl = settings.GEOCODE_CACHE_TTL if found else settings.GEOCODE_NEGATIVE_CACHE_TTL
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    GeocodeCache.objects.update_or_create(
+        address_hash=key,
+        defaults={
+            'address': normalize_address(address),
+            'latitude': coordinates[0],
+            'longitude': coordinates[1],
+            'expires_at': expires_at,
+        },
+    )
+    _memory_cache.set(key, coordinates, expires_at.timestamp())
+    return coordinates
+
+
+def _geocoded_models():
+    from .models import Services, Subscriber
+    return (Services, Subscriber)
+
+
+def _resolve_row(model, row):
+    """
+    Geocode one pending row and write the outcome back. Only a real no-match
+    fails the row at once; OpenCage errors (outages, rate limits, exhausted
+    quota, rejected key) leave it pending and retry with backoff until
+    GEOCODE_MAX_ATTEMPTS.
+    """
+    from .models import GeocodedModel, Services
+    from .utils import geohash_encode
+    from .vendor_index import invalidate_vendor_index
+
+    # Only touch the row if its address hasn't changed since it was read
+    pending = model.objects.filter(pk=row.pk, address=row.address, geocode_status=GeocodedModel.GEOCODE_PENDING)
+    try:
+        latitude, longitude = geocode_address(row.address)
+    except Exception:
+        attempts = row.geocode_attempts + 1
+        if attempts >= settings.GEOCODE_MAX_ATTEMPTS:
+            pending.update(geocode_status=GeocodedModel.GEOCODE_FAILED, geocode_attempts=attempts)
+        else:
+            delay = backoff_delay(attempts, settings.GEOCODE_RETRY_BASE_DELAY, settings.GEOCODE_RETRY_MAX_DELAY)
+            pending.update(
+                geocode_attempts=attempts,
+                geocode_next_attempt_at=timezone.now() + timedelta(seconds=delay),
+            )
+        raise
+
+    if latitude is None or longitude is None:
+        # OpenCage has no match for this address; retrying won't change that
+        pending.update(geocode_status=GeocodedModel.GEOCODE_FAILED, geocode_attempts=row.geocode_attempts + 1)
+        return False
+
+    updates = {
+        'latitude': latitude,
+        'longitude': longitude,
+        'geocode_status': GeocodedModel.GEOCODE_RESOLVED,
+        'geocode_attempts': 0,
+        'geocode_next_attempt_at': None,
+    }
+    if model is Services:
+        updates['geohash'] = geohash_encode(latitude, longitude)
+    updated = pending.update(**updates)
+    if updated and model is Services:
+        invalidate_vendor_index()
+    return bool(updated)
+
+
+def geocode_pending_row(model, pk):
+    """Background task queued by GeocodedModel.save() for a single row."""
+    from .models import GeocodedModel
+    row = (
+        model.objects.filter(pk=pk, geocode_status=GeocodedModel.GEOCODE_PENDING)
+        .only('address', 'geocode_attempts')
+        .first()
+    )
+    if row is not None and row.address:
+        _resolve_row(model, row)
+
+
+def process_pending_geocodes(batch_size=100, concurrency=4):
+    """
+    Geocode up to batch_size due rows per model with at most `concurrency`
+    lookups in flight. Returns the number of rows resolved.
+    """
+    from .models import GeocodedModel
+
+    def resolve(model, row):
+        try:
+            return _resolve_row(model, row)
+        except Exception:
+            return False
+        finally:
+            connection.close()
+
+    resolved = 0
+    now = timezone.now()
+    for model in _geocoded_models():
+        due = list(
+            model.objects.filter(geocode_status=GeocodedModel.GEOCODE_PENDING)
+            .exclude(address__isnull=True).exclude(address='')
+            .filter(Q(geocode_next_attempt_at__isnull=True) | Q(geocode_next_attempt_at__lte=now))
+            .only('address', 'geocode_attempts')
+            .order_by('id')[:batch_size]
+        )
+        if not due:
+            continue
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            resolved += sum(pool.map(lambda row: resolve(model, row), due))
+    return resolved
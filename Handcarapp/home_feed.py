@@ -0,0 +1,113 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .background import submit_on_commit
+from .catalog_cache import bump_catalog_version, catalog_version
+
+# Version namespace of the home feed; only writes to featured content bump it
+HOME_FEED = 'home_feed'
+
+
+def home_feed_products(promoted_brand_ids):
+    """
+    Promoted products and the products of the given promoted brands. Matching
+    brand ids rather than joining on brand.promoted lets PostgreSQL OR the
+    product_promoted_idx and product_brand_eff_price_idx scans instead of reading
+    the whole table.
+    """
+    from .models import Product
+    return (
+        Product.objects.select_related('category', 'brand')
+        .filter(Q(promoted=True) | Q(brand_id__in=promoted_brand_ids))
+        .order_by('id')
+    )
+
+
+def build_home_feed():
+    """
+    Everything the home screen needs: promoted products, promoted brands and
+    the products of promoted brands, with the max discount of each product
+    list. One joined product query covers both product lists and the
+    discounts are folded in the same pass, instead of three endpoints each
+    running an aggregate and lazy-loading category and brand per product.
+    """
+    from .models import Brand
+
+    promoted_brands = list(Brand.objects.filter(promoted=True).values('id', 'name'))
+    products = home_feed_products([brand['id'] for brand in promoted_brands])
+
+    promoted_products, brand_products = [], []
+    max_discount = brands_max_discount = 0
+    for product in products:
+        if product.promoted:
+            promoted_products.append({
+                "id": product.id,
+                "name": product.name,
+                "category": product.category.name,
+                "brand": product.brand.name,
+                "original_price": float(product.price),
+                "discounted_price": float(product.discounted_price),
+                "discount_percentage": product.discount_percentage,
+                "description": product.description,
+                "is_bestseller": product.is_bestseller,
+                "image": product.image,
+                "created_at": product.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            })
+            max_discount = max(max_discount, product.discount_percentage)
+        if product.brand.promoted:
+            brand_products.append({
+                "id": product.id,
+                "name": product.name,
+                "original_price": float(product.price),
+                "discount_percentage": product.discount_percentage,
+                "discounted_price": float(product.discounted_price),
+                "image": product.image if product.image else None,
+            })
+            brands_max_discount = max(brands_max_discount, product.discount_percentage)
+
+    return {
+        "promoted_products": promoted_products,
+        "max_discount": max_discount,
+        "promoted_brands": promoted_brands,
+        "promoted_brands_products": brand_products,
+        "brands_max_discount": brands_max_discount,
+    }
+
+
+def features_any(products):
+    """Whether any product of the queryset is shown on the home feed."""
+    return products.filter(Q(promoted=True) | Q(brand__promoted=True)).exists()
+
+
+def refresh_home_feed():
+    """Build the feed for the current version and store it, unless that is already done."""
+    # Read before building: if a write lands meanwhile, this blob is stored
+    # under the old version and the write's own refresh replaces it
+    key = f'{HOME_FEED}:{catalog_version(HOME_FEED)}'
+    blob = cache.get(key)
+    if blob is None:
+        blob = json.dumps(build_home_feed(), cls=DjangoJSONEncoder).encode('utf-8')
+        cache.set(key, blob, getattr(settings, 'CATALOG_CACHE_TTL', 3600))
+    return blob
+
+
+def invalidate_home_feed():
+    """
+    After the current transaction commits, move the feed to a new version and
+    rebuild it on the background pool, so the rebuild doesn't land on a request.
+    """
+    bump_catalog_version(HOME_FEED)
+    submit_on_commit(refresh_home_feed)
+
+
+def home_feed_blob():
+    """
+    The home feed serialized to JSON bytes. Requests return the stored blob
+    without touching the ORM or the encoder; it is only built here when the
+    cache lost it.
+    """
+    return refresh_home_feed()
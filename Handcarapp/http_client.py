@@ -0,0 +1,242 @@
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .background import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+
+class ExternalServiceError(requests.RequestException):
+    """An outbound call could not be made or kept failing after retries."""
+
+
+class CircuitOpenError(ExternalServiceError):
+    """Calls to a host are being short-circuited after repeated failures."""
+
+
+class CircuitBreaker:
+    """
+    Closed until `failure_threshold` consecutive failures, then open for
+    `reset_timeout` seconds. After that a single trial call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class HostMetrics:
+    """Call counts and a rolling window of recent latencies for one host."""
+
+    def __init__(self, window):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms, error):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self._latencies.append(latency_ms)
+
+    def increment(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            counts = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retries,
+                'short_circuited': self.short_circuited,
+            }
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))], 2)
+
+        counts['latency_ms'] = {
+            'samples': len(latencies),
+            'avg': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'p50': percentile(50),
+            'p95': percentile(95),
+            'p99': percentile(99),
+            'max': round(latencies[-1], 2) if latencies else None,
+        }
+        return counts
+
+
+class HTTPClient:
+    """
+    Shared client for calls to external APIs. One keep-alive connection pool
+    per host, a cap on concurrent requests per host, connect/read timeouts,
+    retries with jittered backoff for idempotent requests, and a circuit
+    breaker per host so a dead upstream fails fast instead of tying up workers.
+    """
+
+    def __init__(self, timeout=None, max_retries=None, pool_size=None, host_concurrency=None,
+                 failure_threshold=None, reset_timeout=None, metrics_window=None):
+        self.timeout = timeout or (
+            getattr(settings, 'HTTP_CLIENT_CONNECT_TIMEOUT', 3.05),
+            getattr(settings, 'HTTP_CLIENT_READ_TIMEOUT', 10),
+        )
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'HTTP_CLIENT_MAX_RETRIES', 2)
+        self.pool_size = pool_size or getattr(settings, 'HTTP_CLIENT_POOL_SIZE', 10)
+        self.host_concurrency = host_concurrency or getattr(settings, 'HTTP_CLIENT_HOST_CONCURRENCY', 8)
+        self.failure_threshold = failure_threshold or getattr(settings, 'HTTP_CIRCUIT_FAILURE_THRESHOLD', 5)
+        self.reset_timeout = reset_timeout or getattr(settings, 'HTTP_CIRCUIT_RESET_TIMEOUT', 30)
+        self.metrics_window = metrics_window or getattr(settings, 'HTTP_CLIENT_METRICS_WINDOW', 1000)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host_state(self, host):
+        with self._hosts_lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = (
+                    threading.BoundedSemaphore(self.host_concurrency),
+                    CircuitBreaker(self.failure_threshold, self.reset_timeout),
+                    HostMetrics(self.metrics_window),
+                )
+            return state
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request and return the response. Connection errors, timeouts
+        and 429/5xx responses are retried for idempotent methods; once retries
+        run out, the last response is returned or ExternalServiceError raised.
+        Raises CircuitOpenError without calling the host while its circuit is open.
+        """
+        method = method.upper()
+        host = urlsplit(url).netloc
+        semaphore, breaker, metrics = self._host_state(host)
+        kwargs.setdefault('timeout', self.timeout)
+        attempts = 1 + (self.max_retries if method in IDEMPOTENT_METHODS else 0)
+
+        # Waiting for a free slot is bounded by the connect timeout
+        timeout = kwargs['timeout']
+        slot_timeout = timeout[0] if isinstance(timeout, tuple) else timeout
+
+        for attempt in range(1, attempts + 1):
+            if not semaphore.acquire(timeout=slot_timeout):
+                raise ExternalServiceError(f"Too many concurrent requests to {host}")
+            try:
+                if not breaker.allow():
+                    metrics.increment('short_circuited')
+                    raise CircuitOpenError(f"Circuit open for {host}")
+
+                response = error = None
+                started = time.perf_counter()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                except Exception:
+                    breaker.record_failure()
+                    raise
+                failed = error is not None or response.status_code >= 500
+                metrics.record((time.perf_counter() - started) * 1000, failed)
+            finally:
+                semaphore.release()
+
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            retryable = error is not None or response.status_code in RETRYABLE_STATUSES
+            if not retryable or attempt == attempts:
+                break
+
+            metrics.increment('retries')
+            delay = self._retry_delay(response, attempt)
+            logger.warning("Retrying %s %s in %.2fs (attempt %d): %s",
+                           method, host, delay, attempt, error or response.status_code)
+            time.sleep(delay)
+
+        if error is not None:
+            raise ExternalServiceError(f"{method} {host} failed: {error}") from error
+        return response
+
+    def _retry_delay(self, response, attempt):
+        base = getattr(settings, 'HTTP_CLIENT_RETRY_BASE_DELAY', 0.5)
+        cap = getattr(settings, 'HTTP_CLIENT_RETRY_MAX_DELAY', 5)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(cap, int(retry_after))
+        return backoff_delay(attempt, base, cap)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def metrics(self):
+        with self._hosts_lock:
+            hosts = dict(self._hosts)
+        return {
+            host: dict(metrics.snapshot(), circuit=breaker.state)
+            for host, (_, breaker, metrics) in sorted(hosts.items())
+        }
+
+
+http_client = HTTPClient()
@@ -0,0 +1,318 @@
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .background import backoff_delay, submit_on_commit
+from .image_processing import INVALID_IMAGE_ERRORS, preprocess_image
+
+logger = logging.getLogger(__name__)
+
+
+class CloudinaryImageStorage:
+    """Production backend: stores images on Cloudinary."""
+
+    def save(self, path, folder):
+        from cloudinary.uploader import upload
+        result = upload(path, folder=folder or None, timeout=getattr(settings, 'IMAGE_UPLOAD_TIMEOUT', 60))
+        return result['secure_url'], result['public_id']
+
+    def delete(self, public_id):
+        from cloudinary.uploader import destroy
+        destroy(public_id)
+
+
+class LocalImageStorage:
+    """Stand-in for Cloudinary that copies images under IMAGE_UPLOAD_LOCAL_ROOT, for tests and development."""
+
+    def save(self, path, folder):
+        public_id = os.path.join(folder.strip('/'), uuid.uuid4().hex)
+        extension = os.path.splitext(path)[1]
+        destination = os.path.join(settings.IMAGE_UPLOAD_LOCAL_ROOT, public_id + extension)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(path, destination)
+        return settings.IMAGE_UPLOAD_LOCAL_URL + public_id + extension, public_id
+
+    def delete(self, public_id):
+        directory, name = os.path.split(os.path.join(settings.IMAGE_UPLOAD_LOCAL_ROOT, public_id))
+        for filename in os.listdir(directory) if os.path.isdir(directory) else ():
+            if os.path.splitext(filename)[0] == name:
+                os.remove(os.path.join(directory, filename))
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_image_storage():
+    """The backend named by IMAGE_UPLOAD_STORAGE, created once per process."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = import_string(getattr(
+                settings, 'IMAGE_UPLOAD_STORAGE', 'Handcarapp.image_uploads.CloudinaryImageStorage'))()
+        return _storage
+
+
+def public_id_from_url(url, folder):
+    """The storage public_id of an image URL in folder, or None if it isn't one of ours."""
+    match = re.search(re.escape(folder.strip('/') + '/') + r'([^\.]+)', url or '')
+    return f"{folder.strip('/')}/{match.group(1)}" if match else None
+
+
+def _spool_dir():
+    return getattr(settings, 'IMAGE_UPLOAD_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'upload_spool'))
+
+
+def _spool(uploaded_file):
+    """Write an uploaded file to the spool directory chunk by chunk and return its path."""
+    os.makedirs(_spool_dir(), exist_ok=True)
+    extension = os.path.splitext(uploaded_file.name or '')[1].lower()[:10]
+    path = os.path.join(_spool_dir(), uuid.uuid4().hex + extension)
+    with open(path, 'wb') as out:
+        for chunk in uploaded_file.chunks():
+            out.write(chunk)
+    return path
+
+
+def _remove_spool(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def image_upload_data(upload):
+    return {
+        "id": upload.id,
+        "status": upload.status,
+        "url": upload.url,
+        "error": upload.error or None,
+    }
+
+
+def queue_image_upload(uploaded_file, target, target_id, folder=''):
+    """
+    Spool an uploaded image and create its pending ImageUpload. Preprocessing
+    and the upload to storage start on the background pool once the current
+    transaction commits.
+    """
+    from .models import ImageUpload
+    path = _spool(uploaded_file)
+    upload = ImageUpload.objects.create(
+        target=target,
+        target_id=target_id,
+        folder=folder,
+        spool_path=path,
+        original_name=(uploaded_file.name or '')[:255],
+    )
+    submit_on_commit(upload_image, upload.pk)
+    return upload
+
+
+def _schedule_retry(upload_id, delay):
+    # Best effort within this process; process_image_uploads picks up whatever
+    # a restart loses
+    timer = threading.Timer(delay, submit_on_commit, (upload_image, upload_id))
+    timer.daemon = True
+    timer.start()
+
+
+def _upload_failed(upload, error):
+    from .models import ImageUpload
+    attempts = upload.attempts + 1
+    claimed = ImageUpload.objects.filter(pk=upload.pk, status=ImageUpload.STATUS_UPLOADING)
+    permanent = isinstance(error, (FileNotFoundError,) + INVALID_IMAGE_ERRORS)
+    message = str(error)
+    if isinstance(error, INVALID_IMAGE_ERRORS):
+        # Pillow's message names the spool path, which clients shouldn't see
+        message = "The file is not a valid image."
+    if permanent or attempts >= settings.IMAGE_UPLOAD_MAX_ATTEMPTS:
+        logger.warning("Image upload %s failed for good: %s", upload.pk, error)
+        claimed.update(status=ImageUpload.STATUS_FAILED, attempts=attempts, error=message, updated_at=timezone.now())
+        _remove_spool(upload.spool_path)
+        return
+    delay = backoff_delay(attempts, settings.IMAGE_UPLOAD_RETRY_BASE_DELAY, settings.IMAGE_UPLOAD_RETRY_MAX_DELAY)
+    logger.info("Image upload %s failed (attempt %s), retrying in %.0fs: %s", upload.pk, attempts, delay, error)
+    claimed.update(
+        status=ImageUpload.STATUS_PENDING,
+        attempts=attempts,
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        error=message,
+        updated_at=timezone.now(),
+    )
+    _schedule_retry(upload.pk, delay)
+
+
+def _delete_stored(public_id):
+    if not public_id:
+        return
+    try:
+        get_image_storage().delete(public_id)
+    except Exception:
+        logger.exception("Failed to delete stored image %s", public_id)
+
+
+def _attach(upload, url, public_id):
+    """Point the upload's target at the stored image; runs inside the transaction that marks it done."""
+    from .catalog_cache import bump_catalog_version
+    from .models import ImageUpload, Product, ServiceImage, Services
+    from .home_feed import features_any, invalidate_home_feed
+    from .product_detail import invalidate_product_detail
+
+    if upload.target == ImageUpload.TARGET_PRODUCT:
+        product = Product.objects.select_for_update().filter(pk=upload.target_id).only('image').first()
+        newer = ImageUpload.objects.filter(
+            target=upload.target, target_id=upload.target_id, status=ImageUpload.STATUS_DONE, pk__gt=upload.pk,
+        ).exists()
+        if product is None or newer:
+            # The product is gone, or a later edit's image already replaced this one
+            transaction.on_commit(lambda: _delete_stored(public_id))
+            return
+        old_public_id = public_id_from_url(product.image, upload.folder) if upload.folder else None
+        Product.objects.filter(pk=product.pk).update(image=url)
+        bump_catalog_version()
+        invalidate_product_detail(product.pk)
+        if features_any(Product.objects.filter(pk=product.pk)):
+            invalidate_home_feed()
+        transaction.on_commit(lambda: _delete_stored(old_public_id))
+    elif upload.target == ImageUpload.TARGET_SERVICE:
+        if Services.objects.filter(pk=upload.target_id).exists():
+            ServiceImage.objects.create(service_id=upload.target_id, image=url, public_id=public_id)
+        else:
+            transaction.on_commit(lambda: _delete_stored(public_id))
+
+
+def attach_stored_image(target, target_id, folder, url, public_id):
+    """
+    Record an image that is already in storage, e.g. uploaded by the client
+    directly, and attach it to its target. Attaching the same public_id again
+    returns the existing record.
+    """
+    from .models import ImageUpload
+    with transaction.atomic():
+        existing = ImageUpload.objects.filter(public_id=public_id, status=ImageUpload.STATUS_DONE).first()
+        if existing is not None:
+            return existing
+        upload = ImageUpload.objects.create(
+            target=target,
+            target_id=target_id,
+            folder=folder,
+            spool_path='',
+            status=ImageUpload.STATUS_DONE,
+            url=url,
+            public_id=public_id,
+        )
+        _attach(upload, url, public_id)
+    return upload
+
+
+def upload_image(upload_id):
+    """
+    Background task: push one spooled image to storage and attach it to its
+    target. Transient failures are retried with backoff. Returns True if the
+    image was stored.
+    """
+    from .models import ImageUpload
+
+    # Claim the row so a retry timer and the sweeper never upload it twice
+    claimed = ImageUpload.objects.filter(pk=upload_id, status=ImageUpload.STATUS_PENDING).update(
+        status=ImageUpload.STATUS_UPLOADING, updated_at=timezone.now())
+    if not claimed:
+        return False
+    upload = ImageUpload.objects.get(pk=upload_id)
+
+    try:
+        if upload.width is None:
+            # Downscale and strip the raw photo once; retries reuse the result
+            upload.spool_path, upload.width, upload.height = preprocess_image(upload.spool_path)
+            ImageUpload.objects.filter(pk=upload.pk).update(
+                spool_path=upload.spool_path, width=upload.width, height=upload.height)
+        url, public_id = get_image_storage().save(upload.spool_path, upload.folder)
+    except Exception as e:
+        _upload_failed(upload, e)
+        return False
+
+    try:
+        with transaction.atomic():
+            ImageUpload.objects.filter(pk=upload.pk).update(
+                status=ImageUpload.STATUS_DONE,
+                url=url,
+                public_id=public_id,
+                error='',
+                next_attempt_at=None,
+                updated_at=timezone.now(),
+            )
+            _attach(upload, url, public_id)
+    except Exception as e:
+        # Nothing points at the stored copy; a retry uploads it again
+        _delete_stored(public_id)
+        _upload_failed(upload, e)
+        return False
+    _remove_spool(upload.spool_path)
+    return True
+
+
+def _remove_orphaned_spool_files(older_than):
+    """Delete spooled files whose upload row was never committed or is already finished."""
+    from .models import ImageUpload
+    spool_dir = _spool_dir()
+    if not os.path.isdir(spool_dir):
+        return
+    active = set(
+        ImageUpload.objects.filter(status__in=[ImageUpload.STATUS_PENDING, ImageUpload.STATUS_UPLOADING])
+        .values_list('spool_path', flat=True)
+    )
+    cutoff = time.time() - older_than
+    for entry in os.scandir(spool_dir):
+        if entry.is_file() and entry.path not in active and entry.stat().st_mtime < cutoff:
+            _remove_spool(entry.path)
+
+
+def process_image_uploads(batch_size=100, concurrency=4):
+    """
+    Sweeper for the upload queue: requeue uploads whose worker died mid-way,
+    upload up to batch_size due images with at most `concurrency` in flight,
+    and clear orphaned spool files. Returns the number of images stored.
+    """
+    from .models import ImageUpload
+
+    stale_after = settings.IMAGE_UPLOAD_STALE_AFTER
+    now = timezone.now()
+    ImageUpload.objects.filter(
+        status=ImageUpload.STATUS_UPLOADING, updated_at__lt=now - timedelta(seconds=stale_after),
+    ).update(status=ImageUpload.STATUS_PENDING, updated_at=now)
+
+    due = list(
+        ImageUpload.objects.filter(status=ImageUpload.STATUS_PENDING)
+        .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+        .order_by('id')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+
+    def upload(upload_id):
+        try:
+            return upload_image(upload_id)
+        except Exception:
+            logger.exception("Image upload %s failed", upload_id)
+            return False
+        finally:
+            connection.close()
+
+    stored = 0
+    if due:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            stored = sum(pool.map(upload, due))
+    _remove_orphaned_spool_files(stale_after)
+    return stored
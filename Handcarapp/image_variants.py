@@ -0,0 +1,37 @@
+import re
+
+from cloudinary.utils import cloudinary_url
+from django.conf import settings
+
+_CLOUDINARY_URL = re.compile(r'^(https?://res\.cloudinary\.com/[^/]+/image/upload/)(.+)$')
+
+
+def _transformation(width):
+    # c_limit never upscales; f_auto / q_auto let Cloudinary pick WebP/AVIF and
+    # the quality per browser. Same order as cloudinary_url emits, so both paths
+    # below produce identical (CDN-cacheable) URLs for the same image.
+    return f'c_limit,f_auto,q_auto,w_{width}'
+
+
+def image_variants(image):
+    """
+    {'thumb': url, 'medium': url, 'full': url} for a stored image URL or
+    Cloudinary public id, widths from IMAGE_VARIANT_WIDTHS. The URLs are
+    derived locally and are the same on every call, so responses that embed
+    them stay cacheable. Images not on Cloudinary get the original URL for
+    every variant; no image gives None.
+    """
+    if not image:
+        return None
+    widths = getattr(settings, 'IMAGE_VARIANT_WIDTHS', {'thumb': 300, 'medium': 800, 'full': 1600})
+
+    match = _CLOUDINARY_URL.match(image)
+    if match:
+        prefix, rest = match.groups()
+        return {name: f'{prefix}{_transformation(width)}/{rest}' for name, width in widths.items()}
+    if '://' in image or image.startswith('/'):
+        return {name: image for name in widths}
+    return {
+        name: cloudinary_url(image, secure=True, crop='limit', fetch_format='auto', quality='auto', width=width)[0]
+        for name, width in widths.items()
+    }
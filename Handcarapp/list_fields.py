@@ -0,0 +1,92 @@
+from collections import namedtuple
+
+from .image_variants import image_variants
+
+# columns: model fields the value reads (related ones as 'relation__field'),
+# get: value from an instance, prefetch: relations loaded with prefetch_related
+Field = namedtuple('Field', ['columns', 'get', 'prefetch'], defaults=[()])
+
+
+class FieldSet:
+    """
+    The fields a list endpoint can return. A fields= parameter picks a subset:
+    narrow() then selects only the columns and joins those fields read, and
+    rows() serializes either to one dict per item or, in compact mode, to one
+    array per field so keys aren't repeated for every item.
+    """
+
+    def __init__(self, fields, default=None):
+        self.fields = fields
+        self.default = list(default or fields)
+
+    def parse(self, value):
+        """Field names from a comma-separated fields= value; the default fields if empty."""
+        if not value:
+            return list(self.default)
+        names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.fields)}.")
+        return names
+
+    def narrow(self, queryset, names, extra_columns=()):
+        """Restrict queryset to the columns, joins and prefetches the named fields need."""
+        columns, relations, prefetches = {'id', *extra_columns}, set(), set()
+        for name in names:
+            field = self.fields[name]
+            columns.update(field.columns)
+            relations.update(column.rsplit('__', 1)[0] for column in field.columns if '__' in column)
+            prefetches.update(field.prefetch)
+        return (
+            queryset.select_related(None).select_related(*relations)
+            .prefetch_related(None).prefetch_related(*prefetches)
+            .only(*columns)
+        )
+
+    def rows(self, objects, names, compact=False):
+        getters = [(name, self.fields[name].get) for name in names]
+        if compact:
+            objects = list(objects)
+            return {name: [get(obj) for obj in objects] for name, get in getters}
+        return [{name: get(obj) for name, get in getters} for obj in objects]
+
+
+PRODUCT_LIST_FIELDS = FieldSet({
+    "id": Field(('id',), lambda product: product.id),
+    "name": Field(('name',), lambda product: product.name),
+    "category": Field(('category__name',), lambda product: product.category.name if product.category else None),
+    "brand": Field(('brand__name',), lambda product: product.brand.name if product.brand else None),
+    "original_price": Field(('price',), lambda product: float(product.price)),
+    "discounted_price": Field(('effective_price',), lambda product: float(product.effective_price)),
+    "stock": Field(('stock',), lambda product: product.stock),
+    "image": Field(('image',), lambda product: product.image if product.image else None),
+    "image_variants": Field(('image',), lambda product: image_variants(product.image)),
+    "description": Field(('description',), lambda product: product.description),
+    "discount_percentage": Field(('discount_percentage',), lambda product: product.discount_percentage),
+    "is_bestseller": Field(('is_bestseller',), lambda product: product.is_bestseller),
+    "average_rating": Field(('rating_summary__average_rating',), lambda product: product.average_rating()),
+    "total_reviews": Field(('rating_summary__review_count',), lambda product: product.total_reviews()),
+})
+
+_SERVICE_FIELDS = {
+    "id": Field(('id',), lambda service: service.id),
+    "vendor_name": Field(('vendor_name',), lambda service: service.vendor_name),
+    "phone_number": Field(('phone_number',), lambda service: service.phone_number),
+    "whatsapp_number": Field(('whatsapp_number',), lambda service: service.whatsapp_number),
+    "service_category": Field(
+        ('service_category__name',),
+        lambda service: service.service_category.name if service.service_category else None,
+    ),
+    "service_details": Field(('service_details',), lambda service: service.service_details),
+    "address": Field(('address',), lambda service: service.address),
+    "rate": Field(('rate',), lambda service: service.rate),
+    "images": Field((), lambda service: [image.image.url for image in service.images.all()], ('images',)),
+    "image_variants": Field(
+        (), lambda service: [image_variants(image.image.url) for image in service.images.all()], ('images',)),
+    "average_rating": Field(('rating_summary__average_rating',), lambda service: service.average_rating()),
+    "total_reviews": Field(('rating_summary__review_count',), lambda service: service.total_reviews()),
+    # Set on the instance by view_service_user when the user's location is known
+    "distance": Field((), lambda service: round(service.distance, 2) if getattr(service, 'distance', None) is not None else None),
+}
+# distance is only returned by default when there is one
+SERVICE_LIST_FIELDS = FieldSet(_SERVICE_FIELDS, default=[name for name in _SERVICE_FIELDS if name != 'distance'])
@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from Handcarapp.image_processing import process_image_file
+
+
+def _synthetic_photo(path, width, height):
+    """A noisy full-size JPEG with an EXIF rotation, sized like a phone photo."""
+    noise = Image.effect_noise((width, height), 60)
+    gradient = Image.linear_gradient('L').resize((width, height))
+    image = Image.merge('RGB', (noise, gradient, Image.blend(noise, gradient, 0.5)))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    image.save(path, 'JPEG', quality=95, exif=exif)
+
+
+class Command(BaseCommand):
+    help = "Measure image preprocessing throughput, in-process and across the process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help="Images to process; synthetic photos are generated if omitted.")
+        parser.add_argument('--count', type=int, default=8, help="Synthetic photos to generate.")
+        parser.add_argument('--size', default='4032x3024', help="Synthetic photo size, WIDTHxHEIGHT.")
+        parser.add_argument('--workers', type=int, default=None, help="Pool processes (default IMAGE_PROCESS_WORKERS).")
+        parser.add_argument('--format', default=None, help="WEBP or JPEG (default IMAGE_OUTPUT_FORMAT).")
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or settings.IMAGE_PROCESS_WORKERS
+        output_format = (options['format'] or settings.IMAGE_OUTPUT_FORMAT).upper()
+        work_dir = tempfile.mkdtemp(prefix='image-benchmark-')
+        try:
+            sources = list(options['paths'])
+            if not sources:
+                width, height = (int(value) for value in options['size'].lower().split('x'))
+                for number in range(options['count']):
+                    path = os.path.join(work_dir, f'photo{number}.jpg')
+                    _synthetic_photo(path, width, height)
+                    sources.append(path)
+            input_bytes = sum(os.path.getsize(path) for path in sources)
+
+            def jobs(run):
+                return [
+                    (path, os.path.join(work_dir, f'{run}-{number}'), settings.IMAGE_MAX_DIMENSION,
+                     output_format, settings.IMAGE_QUALITY)
+                    for number, path in enumerate(sources)
+                ]
+
+            started = time.perf_counter()
+            results = [process_image_file(*job) for job in jobs('serial')]
+            self._report('in-process', started, results, input_bytes)
+
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                # Start the workers before timing, as the long-lived pool would be
+                list(pool.map(int, range(workers)))
+                started = time.perf_counter()
+                results = list(pool.map(process_image_file, *zip(*jobs('pool'))))
+            self._report(f'pool of {workers}', started, results, input_bytes)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _report(self, label, started, results, input_bytes):
+        elapsed = time.perf_counter() - started
+        output_bytes = sum(os.path.getsize(path) for path, _, _ in results)
+        _, width, height = results[0]
+        self.stdout.write(
+            f"{label}: {len(results)} images in {elapsed:.2f}s "
+            f"({len(results) / elapsed:.1f} images/s, {elapsed / len(results) * 1000:.0f} ms each); "
+            f"{input_bytes / 1e6:.1f} MB -> {output_bytes / 1e6:.2f} MB, first output {width}x{height}"
+        )
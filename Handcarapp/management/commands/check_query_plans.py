@@ -0,0 +1,190 @@
+import json
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.http import QueryDict
+from django.utils import timezone
+
+from Handcarapp.home_feed import home_feed_products
+from Handcarapp.models import EFFECTIVE_PRICE, Brand, Category, Product, ProductRatingSummary
+from Handcarapp.pagination import encode_cursor, keyset_queryset
+from Handcarapp.product_filters import apply_product_filters, parse_product_filters
+from Handcarapp.search import update_product_search_vectors
+
+PRODUCT_TABLE = Product._meta.db_table
+RATING_TABLE = ProductRatingSummary._meta.db_table
+WORDS = ['brake', 'pad', 'oil', 'filter', 'wiper', 'blade', 'spark', 'plug', 'battery', 'tyre', 'mirror', 'lamp']
+# Part numbers and model names make searches as selective as on real catalog text
+VOCABULARY = WORDS + [f'{word}{n}' for word in WORDS for n in range(100)]
+
+
+def _seq_scans(plan, tables):
+    """Tables from `tables` that a JSON EXPLAIN plan reads with a sequential scan."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in tables:
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', ()):
+        found.extend(_seq_scans(child, tables))
+    return found
+
+
+def _indexes(plan):
+    names = {plan['Index Name']} if 'Index Name' in plan else set()
+    for child in plan.get('Plans', ()):
+        names |= _indexes(child)
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN every catalog listing query on a seeded dataset and fail if any of them "
+        "reads the product, category or brand table with a sequential scan. Tables small "
+        "enough that scanning them is the cheapest plan are exempt. The dataset is seeded "
+        "into a throwaway database, created and dropped like the test database, so the "
+        "role needs CREATEDB; --no-seed checks the configured database instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50000, help="Products to seed.")
+        parser.add_argument('--categories', type=int, default=200, help="Categories to seed.")
+        parser.add_argument('--brands', type=int, default=500, help="Brands to seed.")
+        parser.add_argument('--no-seed', action='store_true', help="Check against the data already in the database.")
+        parser.add_argument('--min-rows', type=int, default=1000, help="Allow sequential scans of tables with fewer rows.")
+        parser.add_argument('--verbose-plans', action='store_true', help="Print the full text plan of every query.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Query plans are only meaningful on PostgreSQL.")
+
+        if options['no_seed']:
+            # Only refreshes the planner statistics of the real data
+            failures = self.check_plans(options['min_rows'], options['verbose_plans'])
+        else:
+            # Seeding, and the ANALYZE it needs, would leave rows or statistics
+            # behind in a real database even if rolled back, so use a scratch one
+            with self._throwaway_database():
+                self.seed(options['products'], options['categories'], options['brands'])
+                failures = self.check_plans(options['min_rows'], options['verbose_plans'])
+
+        if failures:
+            raise CommandError("Sequential scans in: " + "; ".join(failures))
+        self.stdout.write(self.style.SUCCESS("All catalog queries use indexes."))
+
+    @contextmanager
+    def _throwaway_database(self):
+        """Point the connection at a freshly migrated database for the duration, then drop it."""
+        database_name = connection.settings_dict['NAME']
+        test_settings = connection.settings_dict['TEST']
+        test_name = test_settings.get('NAME')
+        # Its own name, so a concurrent test run's database is never clobbered
+        test_settings['NAME'] = f'query_plans_{database_name}'
+        try:
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                yield
+            finally:
+                connection.creation.destroy_test_db(database_name, verbosity=0)
+        finally:
+            test_settings['NAME'] = test_name
+
+    def check_plans(self, min_rows=1000, verbose=False):
+        """ANALYZE the catalog tables and EXPLAIN every listing query; returns the labels that failed."""
+        sizes = {}
+        with connection.cursor() as cursor:
+            for model in (Category, Brand, Product, ProductRatingSummary):
+                table = model._meta.db_table
+                cursor.execute(f'ANALYZE "{table}"')
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [f'"{table}"'])
+                sizes[table] = cursor.fetchone()[0]
+        failures = []
+        for label, queryset, tables in self._checks():
+            large = [table for table in tables if sizes[table] >= min_rows]
+            failures.extend(self._check(label, queryset, large, verbose))
+        return failures
+
+    def seed(self, product_count, category_count, brand_count):
+        rng = random.Random(42)
+        categories = Category.objects.bulk_create(Category(name=f'Category {n}') for n in range(category_count))
+        brands = Brand.objects.bulk_create(
+            Brand(name=f'Brand {n}', promoted=n % 100 == 0) for n in range(brand_count))
+        now = timezone.now()
+        Product.objects.bulk_create(
+            (
+                Product(
+                    name=' '.join(rng.sample(VOCABULARY, 3)) + f' {n}',
+                    category=rng.choice(categories),
+                    brand=rng.choice(brands),
+                    price=Decimal(rng.randint(100, 500000)) / 100,
+                    description=' '.join(rng.choices(VOCABULARY, k=12)),
+                    stock=rng.randint(0, 100),
+                    discount_percentage=rng.choice([0, 0, 0, 10, 25]),
+                    promoted=rng.random() < 0.01,
+                    created_at=now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)),
+                )
+                for n in range(product_count)
+            ),
+            batch_size=5000,
+        )
+        # bulk_create skips Product.save()
+        Product.objects.update(effective_price=EFFECTIVE_PRICE)
+        # About a third of the products have reviews
+        ProductRatingSummary.objects.bulk_create(
+            (
+                ProductRatingSummary(product_id=product_id, review_count=1, average_rating=rng.randint(10, 50) / 10)
+                for product_id in Product.objects.values_list('id', flat=True).iterator()
+                if rng.random() < 0.3
+            ),
+            batch_size=5000,
+        )
+        update_product_search_vectors(Product.objects.all())
+        self.stdout.write(f"Seeded {product_count} products, {category_count} categories, {brand_count} brands.")
+
+    def _checks(self):
+        """(label, queryset, tables that must not be sequentially scanned) for each listing query."""
+        listing = Product.objects.select_related('category', 'brand', 'rating_summary')
+        category = Category.objects.order_by('id').first()
+        brand = Brand.objects.order_by('id').first()
+        cheap = Product.objects.order_by('effective_price', 'id').values_list('effective_price', 'id')[100]
+        recent = timezone.now() - timedelta(days=30)
+
+        def filtered(query):
+            return apply_product_filters(listing, parse_product_filters(QueryDict(query)))
+
+        product = (PRODUCT_TABLE,)
+        return [
+            ("view_products sort=asc", listing.order_by('effective_price')[:10], product),
+            ("view_products sort=desc cursor", keyset_queryset(
+                listing, ['-effective_price', '-id'], encode_cursor(['-effective_price', '-id'], list(cheap)))[:11], product),
+            ("view_products category", filtered(f'category={category.name}').order_by('effective_price')[:10], product),
+            ("view_products brand", filtered(f'brand={brand.name}').order_by('-effective_price')[:10], product),
+            ("view_products price range", filtered('min_price=10&max_price=12').order_by('effective_price')[:10], product),
+            ("view_products search", filtered('search=brake7 pad')[:10], product),
+            ("filter_and_search_products category_id", Product.objects.filter(category_id=category.id).order_by('effective_price'), product),
+            ("filter_and_search_products min_rating", Product.objects.annotate(
+                rating=Coalesce('rating_summary__average_rating', Value(0.0))).filter(
+                rating_summary__average_rating__gte=4.9).order_by('-rating', 'id')[:10], (PRODUCT_TABLE, RATING_TABLE)),
+            ("filter_and_search_products new_arrivals", Product.objects.filter(created_at__gte=recent).order_by('-created_at'), product),
+            ("promoted products", Product.objects.filter(promoted=True), product),
+            ("home feed products", home_feed_products(list(Brand.objects.filter(promoted=True).values_list('id', flat=True))), product),
+            ("promoted brands", Brand.objects.filter(promoted=True), (Brand._meta.db_table,)),
+            ("category by name", Category.objects.filter(name=category.name), (Category._meta.db_table,)),
+            ("brand by name", Brand.objects.filter(name=brand.name), (Brand._meta.db_table,)),
+        ]
+
+    def _check(self, label, queryset, tables, verbose):
+        plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+        scans = _seq_scans(plan, tables)
+        indexes = ', '.join(sorted(_indexes(plan))) or '-'
+        if scans:
+            self.stdout.write(self.style.ERROR(f"FAIL {label}: Seq Scan on {', '.join(scans)} (indexes: {indexes})"))
+        else:
+            self.stdout.write(f"ok   {label}: {indexes}")
+        if verbose or scans:
+            self.stdout.write(queryset.explain())
+        return [label] if scans else []
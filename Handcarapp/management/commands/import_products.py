@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Handcarapp.product_import import detect_format, import_products
+
+
+class Command(BaseCommand):
+    help = "Bulk import products from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file to import.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help="File format; detected from the extension by default.")
+        parser.add_argument('--chunk-size', type=int, help="Rows inserted per transaction.")
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or detect_format(options['path'])
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = import_products(stream, file_format, options['chunk_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        if report['error_count'] > len(report['errors']):
+            self.stderr.write(f"... and {report['error_count'] - len(report['errors'])} more errors.")
+        summary = {key: value for key, value in report.items() if key != 'errors'}
+        self.stdout.write(self.style.SUCCESS(f"Import finished: {json.dumps(summary)}"))
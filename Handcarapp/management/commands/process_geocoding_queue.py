@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Handcarapp.geocoding import process_pending_geocodes
+
+
+class Command(BaseCommand):
+    help = "Geocode vendor and subscriber addresses that are waiting in the background queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Rows to pick up per model per pass.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Geocoding lookups to run in parallel.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting after one pass.")
+        parser.add_argument('--interval', type=int, default=30, help="Seconds to sleep between passes with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            resolved = process_pending_geocodes(options['batch_size'], options['concurrency'])
+            self.stdout.write(self.style.SUCCESS(f"Geocoded {resolved} addresses."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Handcarapp.image_uploads import process_image_uploads
+
+
+class Command(BaseCommand):
+    help = "Upload spooled product and vendor images that are waiting or due for a retry."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Uploads to pick up per pass.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Uploads to run in parallel.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting after one pass.")
+        parser.add_argument('--interval', type=int, default=30, help="Seconds to sleep between passes with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            stored = process_image_uploads(options['batch_size'], options['concurrency'])
+            self.stdout.write(self.style.SUCCESS(f"Uploaded {stored} images."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
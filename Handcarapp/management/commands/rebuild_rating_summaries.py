@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from Handcarapp.models import ProductRatingSummary, ServiceRatingSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized product and service rating summaries from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', action='store_true', help="Only rebuild product summaries.")
+        parser.add_argument('--services', action='store_true', help="Only rebuild service summaries.")
+
+    def handle(self, *args, **options):
+        rebuild_all = not options['products'] and not options['services']
+
+        if rebuild_all or options['products']:
+            count = ProductRatingSummary.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt rating summaries for {count} products."))
+
+        if rebuild_all or options['services']:
+            count = ServiceRatingSummary.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt rating summaries for {count} services."))
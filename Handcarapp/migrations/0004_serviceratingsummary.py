@@ -0,0 +1,51 @@
+# Generated by Django 4.2.19 on 2026-10-18 10:05
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+import django.db.models.deletion
+
+
+def backfill_rating_summaries(apps, schema_editor):
+    Service_Rating = apps.get_model('Handcarapp', 'Service_Rating')
+    ServiceRatingSummary = apps.get_model('Handcarapp', 'ServiceRatingSummary')
+    rows = Service_Rating.objects.values('service_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        last_rated_at=Max('created_at'),
+        **{f'rating_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)},
+    )
+    ServiceRatingSummary.objects.bulk_create(
+        [ServiceRatingSummary(average_rating=row['rating_sum'] / row['review_count'], **row) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Handcarapp', '0003_productratingsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceRatingSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('average_rating', models.FloatField(default=0)),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_rated_at', models.DateTimeField(blank=True, null=True)),
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='rating_summary', to='Handcarapp.services')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(backfill_rating_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.19 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+# Copied from Handcarapp.utils as of this migration, so later changes there
+# can't break it or change the data it backfills
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits, bit_count, even = 0, 0, True
+    while len(geohash) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(geohash)
+
+
+def backfill_geohash(apps, schema_editor):
+    Services = apps.get_model('Handcarapp', 'Services')
+    services = list(Services.objects.filter(latitude__isnull=False, longitude__isnull=False))
+    for service in services:
+        service.geohash = geohash_encode(service.latitude, service.longitude)
+    Services.objects.bulk_update(services, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Handcarapp', '0004_serviceratingsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='services',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, max_length=12, null=True),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+def mark_ungeocoded_pending(apps, schema_editor):
+    for model_name in ('Services', 'Subscriber'):
+        model = apps.get_model('Handcarapp', model_name)
+        (
+            model.objects.exclude(address__isnull=True).exclude(address='')
+            .filter(models.Q(latitude__isnull=True) | models.Q(longitude__isnull=True))
+            .update(geocode_status='pending')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Handcarapp', '0006_geocodecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='services',
+            name='geocode_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='services',
+            name='geocode_next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='services',
+            name='geocode_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('resolved', 'Resolved'), ('failed', 'Failed')], db_index=True, default='resolved', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='subscriber',
+            name='geocode_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='subscriber',
+            name='geocode_next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='subscriber',
+            name='geocode_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('resolved', 'Resolved'), ('failed', 'Failed')], db_index=True, default='resolved', max_length=10),
+        ),
+        migrations.RunPython(mark_ungeocoded_pending, migrations.RunPython.noop),
+    ]
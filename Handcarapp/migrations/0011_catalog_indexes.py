@@ -0,0 +1,49 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:40
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run in a transaction, and doesn't block
+    # writes to the catalog tables while the indexes build
+    atomic = False
+
+    dependencies = [
+        ('Handcarapp', '0010_imageupload_dimensions'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='category',
+            index=models.Index(fields=['name'], name='category_name_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='brand',
+            index=models.Index(fields=['name'], name='brand_name_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='brand',
+            index=models.Index(condition=models.Q(('promoted', True)), fields=['id'], name='brand_promoted_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['brand', 'price'], name='product_brand_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['-created_at'], name='product_created_at_desc_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(condition=models.Q(('promoted', True)), fields=['id'], name='product_promoted_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # product_category_price_idx and product_brand_price_idx lead with the
+    # foreign keys, so the single-column FK indexes only slow down writes
+
+    dependencies = [
+        ('Handcarapp', '0011_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='brand',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='Handcarapp.brand'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='Handcarapp.category'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.19 on 2026-10-18 17:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.db.models.functions import Round
+
+
+def fill_effective_price(apps, schema_editor):
+    Product = apps.get_model('Handcarapp', 'Product')
+    Product.objects.update(effective_price=ExpressionWrapper(
+        Round(F('price') - F('price') * F('discount_percentage') / 100, 2),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    ))
+
+
+class Migration(migrations.Migration):
+    # The new indexes are built concurrently, which can't run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('Handcarapp', '0012_drop_product_fk_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(fill_effective_price, migrations.RunPython.noop, atomic=True),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['category', 'effective_price'], name='product_cat_eff_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['brand', 'effective_price'], name='product_brand_eff_price_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='product',
+            index=models.Index(fields=['effective_price', 'id'], name='product_eff_price_id_idx'),
+        ),
+        # Listings no longer sort on the list price
+        RemoveIndexConcurrently(
+            model_name='product',
+            name='product_category_price_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='product',
+            name='product_brand_price_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='product',
+            name='product_price_id_idx',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.19 on 2026-10-18 18:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('Handcarapp', '0013_product_effective_price'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='productratingsummary',
+            index=models.Index(fields=['average_rating'], name='product_rating_avg_idx'),
+        ),
+    ]
@@ -1,7 +1,13 @@
 # models.py
+from decimal import ROUND_HALF_UP, Decimal
+
 from cloudinary.models import CloudinaryField
 from django.core.validators import RegexValidator
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, FloatField, Max, Q, Sum
+from django.db.models.functions import Cast, Round
 from django.contrib.auth.hashers import make_password
 
 # serializers.py
@@ -17,6 +23,12 @@ import uuid
 class Category(models.Model):
     name = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # Product filters and add_product / edit_product look categories up by name
+            models.Index(fields=['name'], name='category_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -24,13 +36,44 @@ class Brand(models.Model):
     name = models.CharField(max_length=255)
     promoted =models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='brand_name_idx'),
+            models.Index(fields=['id'], condition=Q(promoted=True), name='brand_promoted_idx'),
+        ]
+
+    # promoted as loaded from the database; signals use it to tell whether the home feed changed
+    _original_promoted = False
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._original_promoted = instance.__dict__.get('promoted', False)
+        return instance
+
     def __str__(self):
         return self.name
 
+def effective_price(price, discount_percentage):
+    """What a customer pays: price less discount_percentage, rounded to the cent."""
+    price = Decimal(str(price))
+    discount = Decimal(str(discount_percentage or 0))
+    return (price - price * discount / 100).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+# The same value computed in SQL from the row's current columns, for
+# queryset.update() and bulk_update(), which bypass Product.save()
+EFFECTIVE_PRICE = ExpressionWrapper(
+    Round(F('price') - F('price') * F('discount_percentage') / 100, 2),
+    output_field=DecimalField(max_digits=10, decimal_places=2),
+)
+
+
 class Product(models.Model):
     name = models.CharField(max_length=2000)
-    category = models.ForeignKey(Category, on_delete=models.CASCADE)
-    brand = models.ForeignKey(Brand, on_delete=models.CASCADE)
+    # Looked up through the (category, effective_price) and (brand, effective_price) indexes below
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, db_index=False)
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE, db_index=False)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.URLField(max_length=2000, blank=True, null=True)  # Use URLField for Cloudinary URLs
     description = models.TextField(blank=True)
@@ -39,21 +82,60 @@ class Product(models.Model):
     discount_percentage = models.IntegerField(default=0)
     created_at = models.DateTimeField(default=timezone.now)
     promoted = models.BooleanField(default=False)
+    # discounted_price stored so listings can filter and sort on it in SQL. Set
+    # by save(); writes that skip save() must update it with EFFECTIVE_PRICE.
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    # Full-text document over name, brand, category and description; kept in sync by signals.py
+    search_vector = SearchVectorField(null=True, editable=False)
 
-
+    class Meta:
+        # Listing access patterns; manage.py check_query_plans fails if one of
+        # them stops using an index
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_vector_gin'),
+            models.Index(fields=['category', 'effective_price'], name='product_cat_eff_price_idx'),
+            models.Index(fields=['brand', 'effective_price'], name='product_brand_eff_price_idx'),
+            # Price sorts and keyset pages: ORDER BY effective_price, id in either direction
+            models.Index(fields=['effective_price', 'id'], name='product_eff_price_id_idx'),
+            models.Index(fields=['-created_at'], name='product_created_at_desc_idx'),
+            models.Index(fields=['id'], condition=Q(promoted=True), name='product_promoted_idx'),
+        ]
+
+    # (promoted, brand_id) as loaded from the database; signals use it to tell
+    # whether the product was on the home feed before this save
+    _original_feed_state = (False, None)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._original_feed_state = (instance.__dict__.get('promoted', False), instance.__dict__.get('brand_id'))
+        return instance
+
+    # Ratings are read from the denormalized ProductRatingSummary row, so list
+    # queries should select_related('rating_summary') to avoid a query per product.
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews:
-            return round(sum(review.rating for review in reviews) / reviews.count(), 1)
-        return 0
+        summary = getattr(self, 'rating_summary', None)
+        return round(summary.average_rating, 1) if summary else 0
 
+    def total_reviews(self):
+        summary = getattr(self, 'rating_summary', None)
+        return summary.review_count if summary else 0
+
+    def rating_histogram(self):
+        summary = getattr(self, 'rating_summary', None)
+        return summary.histogram() if summary else RatingSummary.empty_histogram()
 
 
     @property
     def discounted_price(self):
-        if self.discount_percentage:
-            return self.price - (self.price * self.discount_percentage / 100)
-        return self.price
+        return effective_price(self.price, self.discount_percentage)
+
+    def save(self, *args, **kwargs):
+        self.effective_price = self.discounted_price
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'discount_percentage'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'effective_price'}
+        super().save(*args, **kwargs)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -136,6 +218,93 @@ class Review(models.Model):
         return f"Review by {self.user.username} on {self.product.name} - Rating: {self.rating}"
 
 
+class RatingSummary(models.Model):
+    """
+    Denormalized rating aggregate kept next to the rated object so listings
+    can read count, average and histogram without touching the rating rows.
+    """
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(default=0)
+    # Histogram of 1-5 star ratings
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def histogram(self):
+        return {str(star): getattr(self, f'rating_{star}') for star in range(1, 6)}
+
+    @staticmethod
+    def empty_histogram():
+        return {str(star): 0 for star in range(1, 6)}
+
+    @classmethod
+    def _record(cls, rating, extra_updates=None, **lookup):
+        # A single UPDATE with F() expressions, so concurrent ratings never lose
+        # increments. Callers run this in the transaction that creates the rating.
+        summary, _ = cls.objects.get_or_create(**lookup)
+        star = f'rating_{rating}'
+        cls.objects.filter(pk=summary.pk).update(
+            review_count=F('review_count') + 1,
+            rating_sum=F('rating_sum') + rating,
+            average_rating=Cast(F('rating_sum') + rating, FloatField()) / (F('review_count') + 1),
+            updated_at=timezone.now(),
+            **{star: F(star) + 1},
+            **(extra_updates or {}),
+        )
+
+    @classmethod
+    def _rebuild(cls, ratings, owner_field, **extra_aggregates):
+        rows = ratings.values(owner_field).annotate(
+            review_count=Count('id'),
+            rating_sum=Sum('rating'),
+            **{f'rating_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)},
+            **extra_aggregates,
+        )
+        summaries = [
+            cls(average_rating=row['rating_sum'] / row['review_count'], **row)
+            for row in rows
+        ]
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(summaries, batch_size=1000)
+        return len(summaries)
+
+
+class ProductRatingSummary(RatingSummary):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='rating_summary')
+
+    class Meta:
+        indexes = [
+            # filter_and_search_products min_rating
+            models.Index(fields=['average_rating'], name='product_rating_avg_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.average_rating:.1f} ({self.review_count} reviews)"
+
+    @classmethod
+    def record_review(cls, review):
+        """Fold a newly created review into its product's summary."""
+        cls._record(int(review.rating), product_id=review.product_id)
+        # Product listings show the rating, so cached catalog responses are stale
+        bump_catalog_version()
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every product summary from the Review table."""
+        count = cls._rebuild(Review.objects.all(), 'product_id')
+        bump_catalog_version()
+        invalidate_product_detail()
+        return count
+
+
 class Address(models.Model):
     UAE_CITIES = [
         ("Abu Dhabi", "Abu Dhabi"),
@@ -205,11 +374,94 @@ class Plan(models.Model):
 
 
 
-from .utils import geocode_address  # Import the geocode function from utils.py
+from .utils import geohash_encode
+from .vendor_index import invalidate_vendor_index
+from .background import submit_on_commit
+from .catalog_cache import bump_catalog_version
+from .product_detail import invalidate_product_detail
+from .geocoding import geocode_pending_row
+
+
 
 
 
 
+class GeocodeCache(models.Model):
+    address_hash = models.CharField(max_length=64, unique=True)  # sha256 of the normalized address
+    address = models.TextField()
+    latitude = models.FloatField(blank=True, null=True)  # Null coordinates cache a failed lookup
+    longitude = models.FloatField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.address
+
+
+class GeocodedModel(models.Model):
+    """
+    Adds background geocoding to models with address / latitude / longitude
+    fields. Saving a new or edited address only marks the row pending; the
+    coordinates are filled in after commit by geocoding.geocode_pending_row or
+    the process_geocoding_queue command.
+    """
+    GEOCODE_PENDING = 'pending'
+    GEOCODE_RESOLVED = 'resolved'
+    GEOCODE_FAILED = 'failed'
+    GEOCODE_STATUS_CHOICES = [
+        (GEOCODE_PENDING, 'Pending'),
+        (GEOCODE_RESOLVED, 'Resolved'),
+        (GEOCODE_FAILED, 'Failed'),
+    ]
+
+    geocode_status = models.CharField(max_length=10, choices=GEOCODE_STATUS_CHOICES, default=GEOCODE_RESOLVED, db_index=True)
+    geocode_attempts = models.PositiveSmallIntegerField(default=0)
+    geocode_next_attempt_at = models.DateTimeField(blank=True, null=True)
+
+    # Address and coordinates as loaded from the database, used to detect edits in save()
+    _original_location = (None, None, None)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._original_location = tuple(instance.__dict__.get(name) for name in ('address', 'latitude', 'longitude'))
+        return instance
+
+    def mark_geocode_pending(self):
+        """
+        Flag the row for background geocoding if its address is new or edited,
+        or was never geocoded. Coordinates set explicitly alongside the address
+        are kept. Returns True when the row needs to be queued.
+        """
+        if not self.address:
+            return False
+
+        original_address, original_lat, original_lng = self._original_location
+        coordinates = (self.latitude, self.longitude)
+        coordinates_given = None not in coordinates and coordinates != (original_lat, original_lng)
+
+        if self.address != original_address:
+            if coordinates_given:
+                self.geocode_status = self.GEOCODE_RESOLVED
+                return False
+            # Stale coordinates must not be used for nearby searches
+            self.latitude = self.longitude = None
+        elif None not in coordinates or self.geocode_status != self.GEOCODE_RESOLVED:
+            return False
+
+        self.geocode_status = self.GEOCODE_PENDING
+        self.geocode_attempts = 0
+        self.geocode_next_attempt_at = None
+        return True
+
+    def queue_geocoding(self):
+        submit_on_commit(geocode_pending_row, type(self), self.pk)
+
+    def remember_location(self):
+        self._original_location = (self.address, self.latitude, self.longitude)
 
 
 class ServiceCategory(models.Model):
@@ -219,7 +471,7 @@ class ServiceCategory(models.Model):
         return self.name
 
 
-class Services(models.Model):
+class Services(GeocodedModel):
     vendor_name = models.CharField(max_length=255,null=True, blank=True)
     phone_number = models.CharField(
         max_length=15,
@@ -238,6 +490,7 @@ class Services(models.Model):
     address = models.TextField(blank=True, null=True)
     latitude = models.FloatField(blank=True, null=True)
     longitude = models.FloatField(blank=True, null=True)
+    geohash = models.CharField(max_length=12, blank=True, null=True, db_index=True)  # Spatial grid cell for nearby searches
     service_category = models.ForeignKey(ServiceCategory, on_delete=models.CASCADE,null=True)
     service_details = models.TextField(null=True)
     rate = models.IntegerField(null=True)
@@ -245,17 +498,37 @@ class Services(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Ratings come from ServiceRatingSummary; select_related('rating_summary') in listings.
+    def average_rating(self):
+        summary = getattr(self, 'rating_summary', None)
+        return round(summary.average_rating, 1) if summary else 0
+
+    def total_reviews(self):
+        summary = getattr(self, 'rating_summary', None)
+        return summary.review_count if summary else 0
+
     def save(self, *args, **kwargs):
-        # If address is provided and latitude/longitude is missing, geocode the address
-        if self.address and (self.latitude is None or self.longitude is None):
-            self.latitude, self.longitude = geocode_address(self.address)
+        # Geocoding runs in the background; a new or edited address only marks the row pending
+        needs_geocoding = self.mark_geocode_pending()
+
+        # Keep the spatial index cell in step with the coordinates
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geohash_encode(self.latitude, self.longitude)
+        else:
+            self.geohash = None
 
         super().save(*args, **kwargs)
 
+        if (self.latitude, self.longitude) != self._original_location[1:]:
+            invalidate_vendor_index()
+        self.remember_location()
+        if needs_geocoding:
+            self.queue_geocoding()
+
 from django.contrib.auth import get_user_model
 User = get_user_model()
 
-class Subscriber(models.Model):
+class Subscriber(GeocodedModel):
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True)
     email = models.EmailField()
     address = models.TextField(blank=True)
@@ -272,11 +545,15 @@ class Subscriber(models.Model):
         if self.start_date and self.duration:
             self.end_date = self.start_date + timedelta(days=self.duration * 30)
 
-        if self.address and (not self.latitude or not self.longitude):
-            self.latitude, self.longitude = geocode_address(self.address)
+        # Geocoding runs in the background; a new or edited address only marks the row pending
+        needs_geocoding = self.mark_geocode_pending()
 
         super().save(*args, **kwargs)
 
+        self.remember_location()
+        if needs_geocoding:
+            self.queue_geocoding()
+
 
 class ServiceImage(models.Model):
     service = models.ForeignKey('Services', on_delete=models.CASCADE, related_name='images')
@@ -288,6 +565,51 @@ class ServiceImage(models.Model):
         return f"Image for {self.service.service_name}"
 
 
+class ImageUpload(models.Model):
+    """
+    An image accepted by a request and spooled to local disk, waiting to be
+    pushed to image storage by image_uploads.upload_image. Once stored, the
+    URL is swapped into the product or added to the vendor's images.
+    """
+    TARGET_PRODUCT = 'product'
+    TARGET_SERVICE = 'service'
+    TARGET_CHOICES = [
+        (TARGET_PRODUCT, 'Product'),
+        (TARGET_SERVICE, 'Service'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_UPLOADING = 'uploading'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_UPLOADING, 'Uploading'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    target_id = models.BigIntegerField()
+    folder = models.CharField(max_length=255, blank=True)
+    spool_path = models.CharField(max_length=1024)
+    original_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+    # Set once image_processing has downscaled and re-encoded the spooled file
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    url = models.URLField(max_length=2000, blank=True, null=True)
+    public_id = models.CharField(max_length=255, blank=True, null=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.target} {self.target_id}: {self.original_name} ({self.status})"
+
+
 class ServiceInteractionLog(models.Model):
     ACTION_CHOICES = [
         ('CALL', 'Call'),
@@ -323,6 +645,28 @@ class Service_Rating(models.Model):
         return f"{self.service.vendor_name} - {self.rating} stars"
 
 
+class ServiceRatingSummary(RatingSummary):
+    service = models.OneToOneField(Services, on_delete=models.CASCADE, related_name='rating_summary')
+    last_rated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.service.vendor_name} - {self.average_rating:.1f} ({self.review_count} ratings)"
+
+    @classmethod
+    def record_rating(cls, service_rating):
+        """Fold a newly created Service_Rating into its service's summary."""
+        cls._record(
+            int(service_rating.rating),
+            extra_updates={'last_rated_at': service_rating.created_at},
+            service_id=service_rating.service_id,
+        )
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every service summary from the Service_Rating table."""
+        return cls._rebuild(Service_Rating.objects.all(), 'service_id', last_rated_at=Max('created_at'))
+
+
 
 
 class Order(models.Model):
@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+
+def parse_page_params(query):
+    """
+    (page, limit) from a listing's query string, with page at least 1 and
+    limit clamped to 1..PRODUCT_LIST_MAX_LIMIT. Raises ValueError if either
+    is not an integer.
+    """
+    page = max(int(query.get('page', 1)), 1)
+    limit = min(max(int(query.get('limit', 10)), 1), getattr(settings, 'PRODUCT_LIST_MAX_LIMIT', 100))
+    return page, limit
+
+
+def encode_cursor(ordering, values):
+    """Opaque cursor holding the ordering and the sort key of the last row returned."""
+    payload = json.dumps({'o': ordering, 'v': [str(value) for value in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, ordering):
+    """Return the sort key values stored in a cursor, or raise ValueError if it can't be used with this ordering."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values = payload['v']
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor.")
+    if payload.get('o') != ordering or len(values) != len(ordering):
+        raise ValueError("Cursor does not match the requested sort order.")
+    return values
+
+
+def _after(ordering, values):
+    """
+    Filter for rows strictly after `values` in `ordering`, e.g. for
+    ['-price', '-id']: price < p OR (price = p AND id < i).
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def keyset_queryset(queryset, ordering, cursor=None):
+    """queryset ordered by `ordering` and starting after the cursor's row."""
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(_after(ordering, decode_cursor(cursor, ordering)))
+    return queryset
+
+
+def keyset_paginate(queryset, ordering, cursor=None, limit=10):
+    """
+    Page through queryset ordered by `ordering`, which must end in a unique
+    field (normally id). Instead of COUNT(*) and OFFSET, each page seeks past
+    the cursor and fetches limit + 1 rows to learn whether there is a next page.
+    Returns (rows, next_cursor, has_next).
+    """
+    if limit < 1:
+        raise ValueError("Page size must be at least 1.")
+    rows = list(keyset_queryset(queryset, ordering, cursor)[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor(ordering, [getattr(last, field.lstrip('-')) for field in ordering])
+    return rows, next_cursor, has_next
+
+
+def approximate_count(queryset, timeout=None):
+    """
+    Row count for callers that only need a rough total. An unfiltered table on
+    PostgreSQL uses the planner's estimate; anything else is counted once and
+    cached for PAGINATION_COUNT_CACHE_TTL seconds per distinct query.
+    """
+    if not queryset.query.where and connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been analyzed
+        if row and row[0] >= 0:
+            return row[0]
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = 'approx_count:' + hashlib.md5(f'{sql}|{params}'.encode('utf-8')).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        if timeout is None:
+            timeout = getattr(settings, 'PAGINATION_COUNT_CACHE_TTL', 300)
+        cache.set(key, count, timeout)
+    return count
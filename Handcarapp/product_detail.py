@@ -0,0 +1,99 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .catalog_cache import bump_catalog_version, catalog_version
+from .image_variants import image_variants
+
+PRODUCT_DETAIL = 'product_detail'
+
+
+def _product_namespace(product_id):
+    return f'{PRODUCT_DETAIL}:{product_id}'
+
+
+def invalidate_product_detail(product_id=None):
+    """
+    Drop the cached detail of one product once the current transaction
+    commits, or of every product when product_id is None (brand and category
+    renames, bulk updates that bypass save()).
+    """
+    bump_catalog_version(_product_namespace(product_id) if product_id is not None else PRODUCT_DETAIL)
+
+
+def build_product_detail(product_id):
+    """
+    Product, category, brand, rating summary and the newest reviews in two
+    queries: one join for the product and one for the reviews with their
+    authors. Returns None if there is no such product.
+    """
+    from .models import Product, Review
+
+    reviews_shown = getattr(settings, 'PRODUCT_DETAIL_REVIEWS', 10)
+    reviews = (
+        Review.objects.select_related('user')
+        .only('product', 'rating', 'comment', 'created_at', 'user__first_name')
+        .order_by('-created_at', '-id')
+    )
+    product = (
+        Product.objects.select_related('category', 'brand', 'rating_summary')
+        .defer('search_vector')
+        # One extra review tells whether there are more than reviews_shown
+        .prefetch_related(Prefetch('reviews', queryset=reviews[:reviews_shown + 1], to_attr='first_reviews'))
+        .filter(pk=product_id)
+        .first()
+    )
+    if product is None:
+        return None
+
+    return {
+        "id": product.id,
+        "name": product.name,
+        "description": product.description,
+        "original_price": float(product.price),
+        "discounted_price": float(product.effective_price),
+        "discount_percentage": product.discount_percentage,
+        "stock": product.stock,
+        "is_bestseller": product.is_bestseller,
+        "image": product.image,
+        "image_variants": image_variants(product.image),
+        "created_at": product.created_at,
+        "category": {"id": product.category.id, "name": product.category.name} if product.category else None,
+        "brand": {"id": product.brand.id, "name": product.brand.name} if product.brand else None,
+        "average_rating": product.average_rating(),
+        "total_reviews": product.total_reviews(),
+        "rating_histogram": product.rating_histogram(),
+        "reviews": [
+            {
+                "id": review.id,
+                "user": review.user.first_name,
+                "rating": review.rating,
+                "comment": review.comment,
+                "created_at": review.created_at,
+            }
+            for review in product.first_reviews[:reviews_shown]
+        ],
+        "has_more_reviews": len(product.first_reviews) > reviews_shown,
+    }
+
+
+def product_detail_blob(product_id):
+    """
+    The product detail serialized to JSON bytes, cached per product until a
+    write to the product or its reviews. None if there is no such product.
+    """
+    key = (
+        f'{PRODUCT_DETAIL}:{product_id}:{catalog_version(PRODUCT_DETAIL)}'
+        f':{catalog_version(_product_namespace(product_id))}'
+    )
+    blob = cache.get(key)
+    if blob is None:
+        detail = build_product_detail(product_id)
+        if detail is None:
+            return None
+        blob = json.dumps(detail, cls=DjangoJSONEncoder).encode('utf-8')
+        cache.set(key, blob, getattr(settings, 'CATALOG_CACHE_TTL', 3600))
+    return blob
@@ -0,0 +1,125 @@
+import hashlib
+import json
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, CharField, Count, Q, Value, When
+
+from .catalog_cache import catalog_version
+from .search import search_product_queryset
+
+
+def _split(value):
+    return sorted({item.strip() for item in value.split(',') if item.strip()})
+
+
+def parse_product_filters(params):
+    """
+    Normalized view_products filters from query params. Equivalent requests
+    produce identical dicts, so this also serves as the facet cache key.
+    """
+    return {
+        'search': ' '.join(params.get('search', '').split()),
+        'category': _split(params.get('category', '')),
+        'brand': _split(params.get('brand', '')),
+        'min_price': params.get('min_price', '').strip(),
+        'max_price': params.get('max_price', '').strip(),
+    }
+
+
+def _price_q(filters):
+    # Prices filter on what the customer pays, after discount
+    q = Q()
+    if filters['min_price']:
+        q &= Q(effective_price__gte=filters['min_price'])
+    if filters['max_price']:
+        q &= Q(effective_price__lte=filters['max_price'])
+    return q
+
+
+def apply_product_filters(products, filters):
+    if filters['search']:
+        products = search_product_queryset(products, filters['search'])
+    if filters['category']:
+        products = products.filter(category__name__in=filters['category'])
+    if filters['brand']:
+        products = products.filter(brand__name__in=filters['brand'])
+    price_q = _price_q(filters)
+    if price_q:
+        products = products.filter(price_q)
+    return products
+
+
+def price_bands():
+    """[(label, low, high), ...] from the PRODUCT_PRICE_BANDS boundaries; the last band is open-ended."""
+    bounds = getattr(settings, 'PRODUCT_PRICE_BANDS', [0, 100, 250, 500, 1000, 2500])
+    bands = [(f'{low}-{high}', low, high) for low, high in zip(bounds, bounds[1:])]
+    bands.append((f'{bounds[-1]}+', bounds[-1], None))
+    return bands
+
+
+def _price_band_expression():
+    whens = [
+        When(effective_price__gte=low, effective_price__lt=high, then=Value(label)) if high is not None
+        else When(effective_price__gte=low, then=Value(label))
+        for label, low, high in price_bands()
+    ]
+    return Case(*whens, default=Value(None), output_field=CharField())
+
+
+def _facet_counts(products, filters):
+    """
+    Category, brand and price-band counts from one GROUP BY over the search
+    results. Each facet ignores its own filter but applies the others, so
+    picking a brand still shows how many products the other brands have.
+    """
+    group = {'price_band': _price_band_expression()}
+    price_q = _price_q(filters)
+    if price_q:
+        group['in_price'] = Case(When(price_q, then=Value(True)), default=Value(False), output_field=BooleanField())
+    rows = (
+        products.order_by()
+        .annotate(**group)
+        .values('category__name', 'brand__name', *group)
+        .annotate(count=Count('id'))
+    )
+
+    categories, brands, bands = Counter(), Counter(), Counter()
+    total = 0
+    for row in rows:
+        in_category = not filters['category'] or row['category__name'] in filters['category']
+        in_brand = not filters['brand'] or row['brand__name'] in filters['brand']
+        in_price = row.get('in_price', True)
+        if in_brand and in_price:
+            categories[row['category__name']] += row['count']
+        if in_category and in_price:
+            brands[row['brand__name']] += row['count']
+        if in_category and in_brand:
+            bands[row['price_band']] += row['count']
+            if in_price:
+                total += row['count']
+
+    def ordered(counter):
+        return [{'name': name, 'count': count} for name, count in counter.most_common() if name is not None]
+
+    return {
+        'total': total,
+        'category': ordered(categories),
+        'brand': ordered(brands),
+        'price': [{'name': label, 'count': bands[label]} for label, _, _ in price_bands()],
+    }
+
+
+def product_facets(filters):
+    """Facet counts for a normalized filter set, cached until the catalog changes."""
+    from .models import Product
+    key = f'product_facets:{catalog_version()}:' + hashlib.md5(json.dumps(filters, sort_keys=True).encode('utf-8')).hexdigest()
+    facets = cache.get(key)
+    if facets is None:
+        products = Product.objects.all()
+        if filters['search']:
+            products = search_product_queryset(products, filters['search'])
+        facets = _facet_counts(products, filters)
+        cache.set(key, facets, getattr(settings, 'FACET_CACHE_TTL', 300))
+    return facets
@@ -0,0 +1,237 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .autocomplete import autocomplete_index
+from .catalog_cache import bump_catalog_version
+from .home_feed import features_any, invalidate_home_feed
+from .models import Brand, Category, Product, effective_price
+from .search import update_product_search_vectors
+
+# Errors beyond this many are counted but not listed in the report
+MAX_REPORTED_ERRORS = 1000
+# Product.price is DecimalField(max_digits=10, decimal_places=2)
+MAX_PRICE = Decimal('100000000')
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def iter_rows(stream, file_format):
+    """Yield (row_number, dict) one row at a time from a binary CSV or NDJSON stream."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=2):  # row 1 is the header
+            yield number, row
+    elif file_format == 'ndjson':
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else ValueError("Invalid JSON object.")
+    else:
+        raise ValueError("Unsupported format. Use 'csv' or 'ndjson'.")
+
+
+def _text(row, *names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ''):
+            return str(value).strip()
+    return ''
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('true', '1', 'yes')
+
+
+def parse_price(value):
+    """Price as a Decimal rounded to the cent; raises ValueError unless it is a finite number in range."""
+    try:
+        price = Decimal(str(value).strip()).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError("Price must be a valid number.")
+    # NaN would otherwise raise InvalidOperation from the comparison below
+    if not price.is_finite():
+        raise ValueError("Price must be a valid number.")
+    if not Decimal(0) <= price < MAX_PRICE:
+        raise ValueError(f"Price must be between 0 and {MAX_PRICE}.")
+    return price
+
+
+def parse_discount_percentage(value):
+    try:
+        discount_percentage = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("discount_percentage must be an integer.")
+    if not 0 <= discount_percentage <= 100:
+        raise ValueError("discount_percentage must be between 0 and 100.")
+    return discount_percentage
+
+
+def parse_row(row):
+    """Validate one import row the way add_product does; returns field values or raises ValueError."""
+    name = _text(row, 'name')
+    category_name = _text(row, 'category_name', 'category')
+    brand_name = _text(row, 'brand_name', 'brand')
+    price = _text(row, 'price')
+    stock = _text(row, 'stock')
+    if not all([name, category_name, brand_name, price, stock]):
+        raise ValueError("Name, category_name, brand_name, price, and stock are required.")
+    for value, model in ((name, Product), (category_name, Category), (brand_name, Brand)):
+        max_length = model._meta.get_field('name').max_length
+        if len(value) > max_length:
+            raise ValueError(f"{model.__name__} name must be at most {max_length} characters.")
+
+    price = parse_price(price)
+    try:
+        stock = int(stock)
+    except ValueError:
+        raise ValueError("Stock must be a valid integer.")
+    discount_percentage = parse_discount_percentage(_text(row, 'discount_percentage') or 0)
+
+    return {
+        'name': name,
+        'category_name': category_name,
+        'brand_name': brand_name,
+        'price': price,
+        'stock': stock,
+        'description': _text(row, 'description'),
+        'is_bestseller': _as_bool(row.get('is_bestseller')),
+        'discount_percentage': discount_percentage,
+        'promoted': _as_bool(row.get('promoted')),
+        'image': _text(row, 'image', 'image_url') or None,
+    }
+
+
+class ProductImporter:
+    """
+    Streams rows into Product with bulk_create, chunk_size rows per
+    transaction. Category and brand names resolve through in-memory maps
+    loaded once; names not seen before are created in one batch per chunk.
+    """
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or getattr(settings, 'PRODUCT_IMPORT_CHUNK_SIZE', 1000)
+        self.categories = {}
+        self.brands = {}
+        for model, names in ((Category, self.categories), (Brand, self.brands)):
+            # Names aren't unique; map each to its oldest row
+            for pk, name in model.objects.order_by('-id').values_list('id', 'name'):
+                names[name] = pk
+        self.created = 0
+        self.categories_created = 0
+        self.brands_created = 0
+        self.error_count = 0
+        self.errors = []
+        self.home_feed_changed = False
+        self._pending = []
+
+    def _error(self, number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'error': message})
+
+    def _create_missing(self, model, names, wanted):
+        missing = sorted({name for name in wanted if name not in names})
+        if missing:
+            for obj in model.objects.bulk_create([model(name=name) for name in missing]):
+                names[obj.name] = obj.pk
+        return len(missing)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        categories, brands = dict(self.categories), dict(self.brands)
+        try:
+            with transaction.atomic():
+                categories_created = self._create_missing(
+                    Category, self.categories, (values['category_name'] for _, values in self._pending))
+                brands_created = self._create_missing(
+                    Brand, self.brands, (values['brand_name'] for _, values in self._pending))
+                products = []
+                for _, values in self._pending:
+                    values = dict(values)
+                    values['category_id'] = self.categories[values.pop('category_name')]
+                    values['brand_id'] = self.brands[values.pop('brand_name')]
+                    # bulk_create skips Product.save()
+                    values['effective_price'] = effective_price(values['price'], values['discount_percentage'])
+                    products.append(Product(**values))
+                created = Product.objects.bulk_create(products, batch_size=self.chunk_size)
+                # bulk_create skips post_save, so refresh the search documents here
+                created_products = Product.objects.filter(pk__in=[product.pk for product in created])
+                update_product_search_vectors(created_products)
+                home_feed_changed = features_any(created_products)
+        except DatabaseError as e:
+            # The chunk was rolled back as a whole, including any new categories and brands
+            self.categories, self.brands = categories, brands
+            for number, _ in self._pending:
+                self._error(number, f"Not imported, chunk failed: {e}")
+        else:
+            self.created += len(created)
+            self.categories_created += categories_created
+            self.brands_created += brands_created
+            self.home_feed_changed = self.home_feed_changed or home_feed_changed
+        self._pending = []
+
+    def add(self, number, row):
+        if isinstance(row, Exception):
+            self._error(number, str(row))
+            return
+        try:
+            self._pending.append((number, parse_row(row)))
+        except ValueError as e:
+            self._error(number, str(e))
+            return
+        if len(self._pending) >= self.chunk_size:
+            self._flush()
+
+    def invalidate(self):
+        if self.created or self.categories_created or self.brands_created:
+            # One invalidation for the whole import instead of one per row
+            bump_catalog_version()
+            autocomplete_index.invalidate()
+        if self.home_feed_changed:
+            invalidate_home_feed()
+
+    def finish(self):
+        self._flush()
+        self.invalidate()
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'categories_created': self.categories_created,
+            'brands_created': self.brands_created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+def import_products(stream, file_format='csv', chunk_size=None):
+    """Import every row of a CSV or NDJSON stream and return the import report."""
+    importer = ProductImporter(chunk_size)
+    try:
+        for number, row in iter_rows(stream, file_format):
+            importer.add(number, row)
+    except Exception:
+        # Chunks committed before the failure are in the catalog all the same
+        importer.invalidate()
+        raise
+    return importer.finish()
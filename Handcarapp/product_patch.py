@@ -0,0 +1,120 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .catalog_cache import bump_catalog_version
+from .home_feed import features_any, invalidate_home_feed
+from .models import EFFECTIVE_PRICE, Product
+from .product_detail import invalidate_product_detail
+from .product_import import _as_bool, parse_discount_percentage, parse_price
+
+PATCHABLE_FIELDS = ('price', 'discount_percentage', 'stock', 'promoted', 'is_bestseller')
+# Changing either of these changes Product.effective_price
+PRICE_FIELDS = {'price', 'discount_percentage'}
+# Products sharing the same new values are updated with one plain UPDATE from this many up
+SHARED_UPDATE_MIN_ROWS = 10
+
+
+def _parse_change(item):
+    """Validate one {id, field: value, ...} entry; returns (id, {field: value}) or raises ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("Each entry must be an object.")
+    unknown = set(item) - {'id'} - set(PATCHABLE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+    try:
+        product_id = int(item['id'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("A valid product id is required.")
+
+    values = {}
+    # Same validation as the product import
+    if 'price' in item:
+        values['price'] = parse_price(item['price'])
+    if 'discount_percentage' in item:
+        values['discount_percentage'] = parse_discount_percentage(item['discount_percentage'])
+    if 'stock' in item:
+        try:
+            values['stock'] = int(item['stock'])
+        except (TypeError, ValueError):
+            raise ValueError("stock must be an integer.")
+    for field in ('promoted', 'is_bestseller'):
+        if field in item:
+            values[field] = _as_bool(item[field])
+    if not values:
+        raise ValueError("Nothing to update.")
+    return product_id, values
+
+
+def _changes_home_feed(changes, product_ids, batch_size):
+    """Whether the patch (un)promoted a product or touched one the home feed shows; run after the updates."""
+    if any('promoted' in changes[product_id] for product_id in product_ids):
+        return True
+    return any(
+        features_any(Product.objects.filter(pk__in=product_ids[start:start + batch_size]))
+        for start in range(0, len(product_ids), batch_size)
+    )
+
+
+def bulk_patch_products(items, batch_size=None):
+    """
+    Apply partial updates to many products in one transaction. Every entry
+    is validated first and nothing is written if any is invalid. Only the
+    columns an entry changes are written, plus effective_price when the
+    price or discount changes. Returns a report with the updated count,
+    unknown ids and per-entry errors.
+    """
+    batch_size = batch_size or getattr(settings, 'PRODUCT_PATCH_BATCH_SIZE', 1000)
+
+    changes, errors = {}, []
+    for index, item in enumerate(items):
+        try:
+            product_id, values = _parse_change(item)
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        # Later entries for the same product win field by field
+        changes.setdefault(product_id, {}).update(values)
+    if errors:
+        return {'updated': 0, 'not_found': [], 'errors': errors}
+
+    ids = list(changes)
+    existing = set()
+    for start in range(0, len(ids), batch_size):
+        existing.update(Product.objects.filter(pk__in=ids[start:start + batch_size]).values_list('pk', flat=True))
+    not_found = sorted(set(ids) - existing)
+
+    # Products getting identical values (same discount, zero stock, ...) share
+    # one plain UPDATE; the rest go through bulk_update's CASE statements,
+    # grouped by the fields they change
+    same_values = defaultdict(list)
+    for product_id in sorted(existing):
+        same_values[tuple(sorted(changes[product_id].items()))].append(product_id)
+    shared, individual = [], defaultdict(list)
+    for values, product_ids in same_values.items():
+        if len(product_ids) >= SHARED_UPDATE_MIN_ROWS:
+            shared.append((dict(values), product_ids))
+        else:
+            fields = tuple(field for field, _ in values)
+            individual[fields].extend(Product(pk=product_id, **dict(values)) for product_id in product_ids)
+    repriced = [product_id for product_id in sorted(existing) if PRICE_FIELDS & changes[product_id].keys()]
+
+    updated = 0
+    with transaction.atomic():
+        for values, product_ids in shared:
+            for start in range(0, len(product_ids), batch_size):
+                updated += Product.objects.filter(pk__in=product_ids[start:start + batch_size]).update(**values)
+        for fields, products in individual.items():
+            updated += Product.objects.bulk_update(products, fields, batch_size=batch_size)
+        # Neither path calls save(), so recompute effective_price from the new columns
+        for start in range(0, len(repriced), batch_size):
+            Product.objects.filter(pk__in=repriced[start:start + batch_size]).update(effective_price=EFFECTIVE_PRICE)
+        if updated:
+            # One invalidation for the whole batch instead of one per product
+            bump_catalog_version()
+            invalidate_product_detail()
+            if _changes_home_feed(changes, sorted(existing), batch_size):
+                invalidate_home_feed()
+
+    return {'updated': updated, 'not_found': not_found, 'errors': []}
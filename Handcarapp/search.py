@@ -0,0 +1,70 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, OuterRef, Q, Subquery
+
+SEARCH_CONFIG = 'english'
+
+
+def search_enabled():
+    # Full-text search needs PostgreSQL; other backends fall back to substring matching
+    return connection.vendor == 'postgresql'
+
+
+def product_search_vector():
+    """
+    Search document for a product: name weighted highest, then brand and
+    category names, then the description. Brand and category are pulled in
+    with subqueries so the expression also works inside QuerySet.update().
+    """
+    from .models import Brand, Category
+    brand_name = Subquery(Brand.objects.filter(pk=OuterRef('brand_id')).values('name')[:1])
+    category_name = Subquery(Category.objects.filter(pk=OuterRef('category_id')).values('name')[:1])
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(brand_name, weight='B', config=SEARCH_CONFIG)
+        + SearchVector(category_name, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_product_search_vectors(queryset):
+    """Recompute the stored search document for every product in queryset."""
+    if search_enabled():
+        queryset.update(search_vector=product_search_vector())
+
+
+def prefix_query(text):
+    """
+    tsquery matching every word of text as a prefix, so results show up
+    while the user is still typing. Returns None if text has no words.
+    """
+    terms = re.findall(r'\w+', text.lower().replace("'", ''))
+    if not terms:
+        return None
+    raw = ' & '.join(f'{term}:*' for term in terms)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_product_queryset(queryset, text):
+    """
+    Filter a Product queryset to matches for text, ranked by relevance.
+    Callers that apply their own sort can order_by() over the ranking.
+    """
+    if not search_enabled():
+        return queryset.filter(
+            Q(name__icontains=text)
+            | Q(description__icontains=text)
+            | Q(brand__name__icontains=text)
+            | Q(category__name__icontains=text)
+        )
+
+    query = prefix_query(text)
+    if query is None:
+        return queryset
+    return (
+        queryset.filter(search_vector=query)
+        .annotate(search_rank=SearchRank(F('search_vector'), query))
+        .order_by('-search_rank', 'id')
+    )
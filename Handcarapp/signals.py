@@ -0,0 +1,129 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import BRAND, CATEGORY, PRODUCT, record_catalog_change
+from .catalog_cache import SERVICE_CATEGORY, bump_catalog_version
+from .home_feed import invalidate_home_feed
+from .models import Brand, Category, Plan, Product, Review, ServiceCategory
+from .product_detail import invalidate_product_detail
+from .search import update_product_search_vectors
+
+
+# Keep Product.search_vector in sync with the fields it is built from
+
+@receiver(post_save, sender=Product)
+def refresh_product_search_vector(sender, instance, **kwargs):
+    update_product_search_vectors(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Brand)
+def refresh_brand_products_search_vector(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    update_product_search_vectors(Product.objects.filter(brand_id=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_products_search_vector(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    update_product_search_vectors(Product.objects.filter(category_id=instance.pk))
+
+
+# Keep the autocomplete prefix index in sync with catalog names
+
+AUTOCOMPLETE_KINDS = {Product: PRODUCT, Brand: BRAND, Category: CATEGORY}
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+def record_autocomplete_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'name' not in update_fields:
+        return
+    record_catalog_change(AUTOCOMPLETE_KINDS[sender], instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def record_autocomplete_delete(sender, instance, **kwargs):
+    record_catalog_change(AUTOCOMPLETE_KINDS[sender], instance.pk)
+
+
+# Any catalog write invalidates the cached catalog responses
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Plan)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceCategory)
+def invalidate_service_category_cache(sender, **kwargs):
+    bump_catalog_version(SERVICE_CATEGORY)
+
+
+# The home feed only changes with promoted products, promoted brands and the
+# products of promoted brands, before or after the write
+
+@receiver(post_save, sender=Product)
+def invalidate_home_feed_for_product(sender, instance, **kwargs):
+    was_promoted, original_brand_id = instance._original_feed_state
+    brand_ids = {instance.brand_id, original_brand_id} - {None}
+    if instance.promoted or was_promoted or Brand.objects.filter(pk__in=brand_ids, promoted=True).exists():
+        invalidate_home_feed()
+    instance._original_feed_state = (instance.promoted, instance.brand_id)
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_home_feed_for_deleted_product(sender, instance, **kwargs):
+    if instance.promoted or Brand.objects.filter(pk=instance.brand_id, promoted=True).exists():
+        invalidate_home_feed()
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def invalidate_home_feed_for_brand(sender, instance, **kwargs):
+    if instance.promoted or instance._original_promoted:
+        invalidate_home_feed()
+    instance._original_promoted = instance.promoted
+
+
+@receiver(post_save, sender=Category)
+def invalidate_home_feed_for_category(sender, instance, created, update_fields=None, **kwargs):
+    # Promoted products show their category name
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    if Product.objects.filter(category_id=instance.pk, promoted=True).exists():
+        invalidate_home_feed()
+
+
+# Cached product details: per product for product and review writes, all of
+# them when a brand or category they embed changes
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_detail_cache(sender, instance, **kwargs):
+    invalidate_product_detail(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviewed_product_detail_cache(sender, instance, **kwargs):
+    invalidate_product_detail(instance.product_id)
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Brand)
+@receiver(post_delete, sender=Category)
+def invalidate_all_product_detail_cache(sender, **kwargs):
+    invalidate_product_detail()
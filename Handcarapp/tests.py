@@ -1,5 +1,646 @@
-from django.test import TestCase
+import io
+import json
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import requests
 
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase, override_settings
 
+from .autocomplete import CHANGE_CACHE_KEY, VERSION_CACHE_KEY, AutocompleteIndex
+from .catalog_cache import catalog_version
+from .geocoding import _memory_cache, _resolve_row
+from .home_feed import HOME_FEED
+from .management.commands.check_query_plans import Command as CheckQueryPlansCommand
+from .http_client import CircuitBreaker, CircuitOpenError, ExternalServiceError, HTTPClient
+from .models import Brand, Category, GeocodeCache, GeocodedModel, Product, Review, Services
+from .pagination import decode_cursor, encode_cursor, keyset_paginate
+from .product_filters import parse_product_filters, product_facets
+from .product_import import import_products, parse_row
+from .product_patch import bulk_patch_products
+from .vendor_index import VERSION_CACHE_KEY as VENDOR_VERSION_CACHE_KEY, VendorCoordinateIndex
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return self._body
+
+
+class SharedCacheRequirementTests(SimpleTestCase):
+    LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}
+
+    def ready(self):
+        apps.get_app_config('Handcarapp').ready()
+
+    def test_local_memory_cache_is_refused_in_production(self):
+        with override_settings(DEBUG=False, CACHES=self.LOCMEM), self.assertRaises(ImproperlyConfigured):
+            self.ready()
+
+    def test_local_memory_cache_is_allowed_in_development(self):
+        with override_settings(DEBUG=True, CACHES=self.LOCMEM):
+            self.ready()
+
+    def test_shared_cache_is_allowed_in_production(self):
+        with override_settings(DEBUG=False, CACHES=self.REDIS):
+            self.ready()
+
+
+
+class FakeClock:
+    """Stands in for the time module; sleeping advances the clock instead of waiting."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    perf_counter = monotonic
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class HTTPClientTests(SimpleTestCase):
+    URL = 'https://api.example.com/v1'
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('Handcarapp.http_client.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = HTTPClient(max_retries=0, failure_threshold=3, reset_timeout=30, host_concurrency=1)
+        self.transport = mock.patch.object(self.client.session, 'request').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def host_metrics(self):
+        return self.client.metrics()['api.example.com']
+
+    def fail_until_open(self):
+        self.transport.side_effect = requests.ConnectionError('refused')
+        for _ in range(3):
+            with self.assertRaises(ExternalServiceError) as raised:
+                self.client.get(self.URL)
+            self.assertNotIsInstance(raised.exception, CircuitOpenError)
+
+    def test_circuit_opens_after_consecutive_failures_and_fails_fast(self):
+        self.fail_until_open()
+        with self.assertRaises(CircuitOpenError):
+            self.client.get(self.URL)
+
+        self.assertEqual(self.transport.call_count, 3)
+        metrics = self.host_metrics()
+        self.assertEqual((metrics['requests'], metrics['errors'], metrics['short_circuited']), (3, 3, 1))
+        self.assertEqual(metrics['latency_ms']['samples'], 3)
+        self.assertEqual(metrics['circuit'], 'open')
+
+    def test_circuit_recovers_after_the_cooldown(self):
+        self.fail_until_open()
+        self.clock.now += 30
+        self.assertEqual(self.host_metrics()['circuit'], 'half-open')
+
+        self.transport.side_effect = None
+        self.transport.return_value = FakeResponse(200)
+        self.assertEqual(self.client.get(self.URL).status_code, 200)
+        self.assertEqual(self.host_metrics()['circuit'], 'closed')
+
+        # Closed again: it takes the full threshold to reopen
+        self.transport.side_effect = requests.Timeout('slow')
+        with self.assertRaises(ExternalServiceError):
+            self.client.get(self.URL)
+        self.assertEqual(self.host_metrics()['circuit'], 'closed')
+
+    def test_failed_trial_reopens_the_circuit(self):
+        self.fail_until_open()
+        self.clock.now += 30
+        self.transport.return_value = FakeResponse(503)
+        self.transport.side_effect = None
+        self.assertEqual(self.client.get(self.URL).status_code, 503)
+
+        self.assertEqual(self.host_metrics()['circuit'], 'open')
+        with self.assertRaises(CircuitOpenError):
+            self.client.get(self.URL)
+        self.assertEqual(self.transport.call_count, 4)
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        self.clock.now += 30
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_idempotent_requests_are_retried_with_backoff(self):
+        client = HTTPClient(max_retries=2, failure_threshold=5)
+        transport = mock.patch.object(client.session, 'request').start()
+        transport.side_effect = [FakeResponse(503, headers={'Retry-After': '2'}), FakeResponse(200)]
+        self.assertEqual(client.get(self.URL).status_code, 200)
+        self.assertEqual(self.clock.sleeps, [2])
+        self.assertEqual(client.metrics()['api.example.com']['retries'], 1)
+
+        # POST is not idempotent, so its failure is returned as is
+        transport.side_effect = [FakeResponse(503), FakeResponse(200)]
+        self.assertEqual(client.post(self.URL).status_code, 503)
+
+    def test_concurrent_requests_are_capped_per_host(self):
+        self.transport.return_value = FakeResponse(200)
+        semaphore, _, _ = self.client._host_state('api.example.com')
+        semaphore.acquire()
+        try:
+            with self.assertRaisesMessage(ExternalServiceError, 'Too many concurrent requests'):
+                self.client.get(self.URL, timeout=0.01)
+            # Other hosts have their own slots
+            self.assertEqual(self.client.get('https://other.example.com/').status_code, 200)
+        finally:
+            semaphore.release()
+        self.assertEqual(self.transport.call_count, 1)
+        self.assertEqual(self.client.get(self.URL).status_code, 200)
+
+class GeocodingTests(TestCase):
+    def setUp(self):
+        _memory_cache.clear()
+        self.vendor = Services.objects.create(vendor_name='Garage', address='1 Test Street, Dubai')
+
+    def resolve(self, response):
+        row = Services.objects.get(pk=self.vendor.pk)
+        with mock.patch('Handcarapp.geocoding.http_client.get', return_value=response):
+            return _resolve_row(Services, row)
+
+    def test_quota_error_leaves_row_pending_for_retry(self):
+        response = FakeResponse(402, {'status': {'code': 402, 'message': 'quota exceeded'}, 'results': []})
+        with self.assertRaises(ExternalServiceError):
+            self.resolve(response)
+
+        vendor = Services.objects.get(pk=self.vendor.pk)
+        self.assertEqual(vendor.geocode_status, GeocodedModel.GEOCODE_PENDING)
+        self.assertEqual(vendor.geocode_attempts, 1)
+        self.assertIsNotNone(vendor.geocode_next_attempt_at)
+        self.assertFalse(GeocodeCache.objects.exists())
+
+    def test_auth_error_fails_row_after_max_attempts(self):
+        Services.objects.filter(pk=self.vendor.pk).update(geocode_attempts=settings.GEOCODE_MAX_ATTEMPTS - 1)
+        response = FakeResponse(401, {'status': {'code': 401, 'message': 'invalid API key'}, 'results': []})
+        with self.assertRaises(ExternalServiceError):
+            self.resolve(response)
+
+        vendor = Services.objects.get(pk=self.vendor.pk)
+        self.assertEqual(vendor.geocode_status, GeocodedModel.GEOCODE_FAILED)
+
+    def test_no_match_fails_row_at_once(self):
+        self.assertFalse(self.resolve(FakeResponse(200, {'status': {'code': 200}, 'results': []})))
+
+        vendor = Services.objects.get(pk=self.vendor.pk)
+        self.assertEqual(vendor.geocode_status, GeocodedModel.GEOCODE_FAILED)
+        self.assertTrue(GeocodeCache.objects.exists())
+
+    def test_match_resolves_row(self):
+        body = {'status': {'code': 200}, 'results': [{'geometry': {'lat': 25.2, 'lng': 55.27}}]}
+        self.assertTrue(self.resolve(FakeResponse(200, body)))
+
+        vendor = Services.objects.get(pk=self.vendor.pk)
+        self.assertEqual(vendor.geocode_status, GeocodedModel.GEOCODE_RESOLVED)
+        self.assertEqual((vendor.latitude, vendor.longitude), (25.2, 55.27))
+        self.assertTrue(vendor.geohash)
+
+
+
+class VendorIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def add_vendor(self, name, latitude, longitude):
+        vendor = Services.objects.create(vendor_name=name, address=f'{name}, Dubai')
+        Services.objects.filter(pk=vendor.pk).update(latitude=latitude, longitude=longitude)
+        return vendor.id
+
+    def test_evicted_version_never_matches_a_loaded_index(self):
+        near = self.add_vendor('Near', 25.2, 55.27)
+        # A worker loaded its index at a small version, then the key was evicted
+        cache.set(VENDOR_VERSION_CACHE_KEY, 1, timeout=None)
+        worker = VendorCoordinateIndex()
+        self.assertEqual([vendor for vendor, _ in worker.nearest(25.2, 55.27)], [near])
+        cache.delete(VENDOR_VERSION_CACHE_KEY)
+
+        far = self.add_vendor('Far', 25.3, 55.4)
+        VendorCoordinateIndex().invalidate()
+        self.assertEqual([vendor for vendor, _ in worker.nearest(25.2, 55.27)], [near, far])
+
+class ProductImportTests(TestCase):
+    ROW = {'name': 'Brake pad', 'category_name': 'Brakes', 'brand_name': 'Bosch', 'price': '12.50', 'stock': '4'}
+
+    def parse(self, **changes):
+        return parse_row({**self.ROW, **changes})
+
+    def test_valid_row(self):
+        values = self.parse(discount_percentage='10')
+        self.assertEqual(values['price'], Decimal('12.50'))
+        self.assertEqual(values['discount_percentage'], 10)
+        self.assertEqual(self.parse()['discount_percentage'], 0)
+
+    def test_rejects_non_finite_and_out_of_range_prices(self):
+        for price in ('NaN', 'nan', 'sNaN', 'Infinity', '-Infinity', '-1', '100000000', 'abc'):
+            with self.subTest(price=price), self.assertRaises(ValueError):
+                self.parse(price=price)
+
+    def test_rejects_invalid_discounts(self):
+        for discount in ('-1', '101', 'abc', '12.5'):
+            with self.subTest(discount=discount), self.assertRaises(ValueError):
+                self.parse(discount_percentage=discount)
+
+    def test_bad_rows_are_reported_and_the_rest_imported(self):
+        csv = (
+            "name,category_name,brand_name,price,stock,discount_percentage\n"
+            "Brake pad,Brakes,Bosch,12.50,4,10\n"
+            "Oil filter,Filters,Bosch,NaN,4,0\n"
+            "Wiper,Wipers,Valeo,8,2,150\n"
+        )
+        report = import_products(io.BytesIO(csv.encode('utf-8')))
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['row'] for error in report['errors']], [3, 4])
+        self.assertEqual(Product.objects.get().effective_price, Decimal('11.25'))
+
+    def test_aborted_import_still_invalidates_committed_chunks(self):
+        stream = io.BytesIO(
+            b"name,category_name,brand_name,price,stock\n"
+            b"Brake pad,Brakes,Bosch,12.50,4\n"
+            # Past the text decoder's first read, so the first row is imported before this fails
+            b"Oil filter,Filters,Bosch," + b"x" * 20000 + b"\xff\n"
+        )
+        version = catalog_version()
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(UnicodeDecodeError):
+            import_products(stream, chunk_size=1)
+
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertGreater(catalog_version(), version)
+
+
+class ProductPatchTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Brakes')
+        brand = Brand.objects.create(name='Bosch')
+        self.products = [
+            Product.objects.create(name=f'Pad {n}', category=category, brand=brand, price=10 + n, stock=1)
+            for n in range(12)
+        ]
+
+    def test_invalid_entries_are_reported_and_nothing_is_written(self):
+        first = self.products[0]
+        report = bulk_patch_products([
+            {'id': first.id, 'stock': 5},
+            {'id': first.id, 'price': 'NaN'},
+            {'id': first.id, 'price': 'Infinity'},
+            {'id': first.id, 'discount_percentage': 101},
+            {'id': first.id, 'discount_percentage': 'abc'},
+            {'id': first.id, 'colour': 'red'},
+            {'price': 5},
+        ])
+
+        self.assertEqual(report['updated'], 0)
+        self.assertEqual([error['index'] for error in report['errors']], [1, 2, 3, 4, 5, 6])
+        first.refresh_from_db()
+        self.assertEqual(first.stock, 1)
+
+    def test_price_and_discount_changes_update_effective_price(self):
+        # The eleven identical changes share one UPDATE; the first product goes through bulk_update
+        changes = [{'id': product.id, 'discount_percentage': 50} for product in self.products]
+        changes.append({'id': self.products[0].id, 'price': '30'})
+        report = bulk_patch_products(changes + [{'id': 0, 'stock': 1}])
+
+        self.assertEqual(report['not_found'], [0])
+        self.assertEqual(report['errors'], [])
+        prices = dict(Product.objects.values_list('id', 'effective_price'))
+        self.assertEqual(prices[self.products[0].id], Decimal('15.00'))
+        self.assertEqual(prices[self.products[1].id], Decimal('5.50'))
+
+
+def run_on_commit(func, *args):
+    # The background pool's connection can't see the test transaction
+    transaction.on_commit(lambda: func(*args))
+
+
+@mock.patch('Handcarapp.home_feed.submit_on_commit', run_on_commit)
+class HomeFeedInvalidationTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Brakes')
+        self.brand = Brand.objects.create(name='Bosch')
+        self.product = Product.objects.create(
+            name='Brake pad', category=self.category, brand=self.brand, price=10, stock=1)
+
+    def write(self, func):
+        """Run func in a committed write; returns whether the home feed version moved."""
+        version = catalog_version(HOME_FEED)
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+        return catalog_version(HOME_FEED) != version
+
+    def cached_feed(self):
+        blob = cache.get(f'{HOME_FEED}:{catalog_version(HOME_FEED)}')
+        return json.loads(blob) if blob is not None else None
+
+    def test_unfeatured_writes_keep_the_feed(self):
+        product = Product.objects.get(pk=self.product.pk)
+        product.stock = 5
+        self.assertFalse(self.write(product.save))
+        self.brand.name = 'Bosch GmbH'
+        self.assertFalse(self.write(self.brand.save))
+
+    def test_promotion_rebuilds_the_feed_after_commit(self):
+        product = Product.objects.get(pk=self.product.pk)
+        product.promoted = True
+        self.assertTrue(self.write(product.save))
+        self.assertEqual([item['id'] for item in self.cached_feed()['promoted_products']], [product.id])
+
+        # Unpromoting is seen through the state loaded from the database
+        product = Product.objects.get(pk=self.product.pk)
+        product.promoted = False
+        self.assertTrue(self.write(product.save))
+        self.assertEqual(self.cached_feed()['promoted_products'], [])
+
+    def test_promoted_brand_products_and_bulk_patches(self):
+        brand = Brand.objects.get(pk=self.brand.pk)
+        brand.promoted = True
+        self.assertTrue(self.write(brand.save))
+        self.assertEqual([item['id'] for item in self.cached_feed()['promoted_brands_products']], [self.product.id])
+
+        self.assertTrue(self.write(lambda: bulk_patch_products([{'id': self.product.id, 'price': '12'}])))
+        self.assertEqual(self.cached_feed()['promoted_brands_products'][0]['original_price'], 12.0)
+
+
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Brakes')
+        self.brand = Brand.objects.create(name='Bosch')
+        self.product = Product.objects.create(
+            name='Brake pad', category=self.category, brand=self.brand, price=10, stock=1)
+
+    def get(self, path, data=None, **headers):
+        # SECURE_SSL_REDIRECT answers plain HTTP with a redirect
+        return self.client.get(path, data, secure=True, **headers)
+
+    def list_products(self, **headers):
+        return self.get('/view_products', {'sort': 'asc'}, **headers)
+
+
+class ConditionalGetTests(CatalogTestCase):
+    def test_etag_revalidates_until_a_write(self):
+        etag = self.list_products()['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.list_products(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # The query string is part of the ETag
+        self.assertNotEqual(self.get('/view_products', {'sort': 'desc'})['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.stock = 3
+            self.product.save()
+        response = self.list_products(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Last-Modified', response)
+
+
+class ProductDetailCacheTests(CatalogTestCase):
+    def detail(self, product):
+        return self.get(f'/product_detail/{product.id}/').json()
+
+    def test_product_detail_is_invalidated_by_its_own_writes(self):
+        other = Product.objects.create(name='Disc', category=self.category, brand=self.brand, price=20, stock=1)
+        self.assertEqual(self.detail(self.product)['reviews'], [])
+
+        # Writes to another product leave this one cached
+        with self.captureOnCommitCallbacks(execute=True):
+            other.stock = 5
+            other.save()
+        with self.assertNumQueries(0):
+            self.detail(self.product)
+
+        user = User.objects.create(username='0500000000', first_name='Sam')
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=user, rating=4, comment='Good')
+        self.assertEqual([review['rating'] for review in self.detail(self.product)['reviews']], [4])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.brand.name = 'Bosch GmbH'
+            self.brand.save()
+        self.assertEqual(self.detail(self.product)['brand']['name'], 'Bosch GmbH')
+
+
+class CatalogResponseCacheTests(CatalogTestCase):
+    def list_ids(self):
+        return [product['id'] for product in self.list_products().json()['products']]
+
+    def test_cached_list_is_served_until_the_write_commits(self):
+        self.assertEqual(self.list_ids(), [self.product.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.list_ids(), [self.product.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Product.objects.create(name='Disc', category=self.category, brand=self.brand, price=20, stock=1)
+            # Not committed yet: the old version and its cached response still stand
+            self.assertEqual(self.list_ids(), [self.product.id])
+
+        self.assertEqual(self.list_ids(), [self.product.id, other.id])
+
+
+
+class FacetedProductsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        brakes, filters, wipers = (Category.objects.create(name=name) for name in ('Brakes', 'Filters', 'Wipers'))
+        bosch, valeo = (Brand.objects.create(name=name) for name in ('Bosch', 'Valeo'))
+        self.products = [
+            Product.objects.create(name=f'Part {n}', category=category, brand=brand, price=price, stock=1)
+            for n, (category, brand, price) in enumerate([
+                (brakes, bosch, 50), (brakes, bosch, 150), (brakes, valeo, 80),
+                (filters, bosch, 30), (filters, valeo, 300), (wipers, valeo, 20),
+            ])
+        ]
+
+    def facets(self, query):
+        with self.assertNumQueries(1):
+            facets = product_facets(parse_product_filters(QueryDict(query)))
+        counts = {facet: {item['name']: item['count'] for item in facets[facet]} for facet in ('category', 'brand')}
+        counts['price'] = {item['name']: item['count'] for item in facets['price'] if item['count']}
+        return facets['total'], counts
+
+    def test_unfiltered_counts(self):
+        total, counts = self.facets('')
+        self.assertEqual(total, 6)
+        self.assertEqual(counts['category'], {'Brakes': 3, 'Filters': 2, 'Wipers': 1})
+        self.assertEqual(counts['brand'], {'Bosch': 3, 'Valeo': 3})
+        self.assertEqual(counts['price'], {'0-100': 4, '100-250': 1, '250-500': 1})
+
+    def test_each_facet_ignores_only_its_own_filter(self):
+        total, counts = self.facets('category=Brakes&brand=Bosch&max_price=100')
+        self.assertEqual(total, 1)
+        # Bosch up to 100, any category
+        self.assertEqual(counts['category'], {'Brakes': 1, 'Filters': 1})
+        # Brakes up to 100, any brand
+        self.assertEqual(counts['brand'], {'Bosch': 1, 'Valeo': 1})
+        # Bosch brakes at any price
+        self.assertEqual(counts['price'], {'0-100': 1, '100-250': 1})
+
+    def test_view_pages_the_filtered_products(self):
+        response = self.client.get(
+            '/faceted_products', {'category': 'Brakes,Filters', 'brand': 'Valeo'}, secure=True).json()
+        self.assertEqual([product['id'] for product in response['products']], [self.products[2].id, self.products[4].id])
+        self.assertEqual(response['total'], 2)
+        self.assertEqual(
+            {item['name']: item['count'] for item in response['facets']['category']},
+            {'Brakes': 1, 'Filters': 1, 'Wipers': 1},
+        )
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Brakes')
+        brand = Brand.objects.create(name='Bosch')
+        # Repeated prices, so pages must break ties on id
+        for n, price in enumerate([10, 5, 10, 20, 5, 10, 15]):
+            Product.objects.create(name=f'Pad {n}', category=category, brand=brand, price=price, stock=1)
+
+    def test_pages_cover_every_row_once(self):
+        for ordering in (['id'], ['effective_price', 'id'], ['-effective_price', '-id']):
+            with self.subTest(ordering=ordering):
+                seen, cursor, has_next = [], None, True
+                while has_next:
+                    rows, cursor, has_next = keyset_paginate(Product.objects.all(), ordering, cursor, limit=2)
+                    seen.extend(row.id for row in rows)
+                self.assertEqual(seen, list(Product.objects.order_by(*ordering).values_list('id', flat=True)))
+
+    def test_view_follows_next_cursor(self):
+        seen, params = [], {'cursor': '', 'sort': 'desc', 'limit': 3}
+        while True:
+            body = self.client.get('/view_products', params, secure=True).json()
+            seen.extend(product['id'] for product in body['products'])
+            if not body['has_next']:
+                break
+            params['cursor'] = body['next_cursor']
+        self.assertEqual(seen, list(Product.objects.order_by('-effective_price', '-id').values_list('id', flat=True)))
+
+    @override_settings(PRODUCT_LIST_MAX_LIMIT=5)
+    def test_page_and_limit_are_validated_and_clamped(self):
+        for params in ({'limit': 'ten'}, {'page': '1.5'}, {'cursor': '', 'limit': 'x'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/view_products', params, secure=True).status_code, 400)
+
+        for params, size in (({'cursor': '', 'limit': 0}, 1), ({'cursor': '', 'limit': -3}, 1), ({'limit': 50}, 5)):
+            with self.subTest(params=params):
+                response = self.client.get('/view_products', params, secure=True)
+                self.assertEqual(len(response.json()['products']), size)
+
+        with self.assertRaises(ValueError):
+            keyset_paginate(Product.objects.all(), ['id'], limit=0)
+
+    def test_invalid_cursors_are_rejected(self):
+        with self.assertRaises(ValueError):
+            decode_cursor('not a cursor', ['id'])
+        with self.assertRaises(ValueError):
+            decode_cursor(encode_cursor(['id'], [1]), ['effective_price', 'id'])
+
+        cursor = encode_cursor(['id'], [1])
+        response = self.client.get('/view_products', {'cursor': cursor, 'sort': 'asc'}, secure=True)
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryPlanCheckTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # The command's default size; smaller catalogs make sequential scans the cheapest plan
+        CheckQueryPlansCommand(stdout=io.StringIO()).seed(50000, 200, 500)
+
+    def setUp(self):
+        self.command = CheckQueryPlansCommand(stdout=io.StringIO())
+
+    def test_catalog_queries_use_indexes(self):
+        self.assertEqual(self.command.check_plans(), [])
+
+    def test_a_dropped_index_is_reported(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX product_eff_price_id_idx')
+        self.assertIn('view_products sort=asc', self.command.check_plans())
+
+
+def run_now(func, *args):
+    # Background rebuilds run inline, inside the test transaction
+    func(*args)
+
+
+@mock.patch('Handcarapp.autocomplete.submit', run_now)
+class AutocompleteJournalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.brand = Brand.objects.create(name='Bosch')
+        self.index = AutocompleteIndex()
+
+    def names(self, text):
+        return [suggestion['name'] for suggestion in self.index.suggest(text)]
+
+    def write(self, func):
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+
+    def rename_brand(self):
+        self.brand.name = 'Valeo'
+        self.brand.save()
+
+    def test_workers_replay_journaled_changes(self):
+        self.assertEqual(self.names('bos'), ['Bosch'])
+
+        self.write(self.rename_brand)
+        self.write(lambda: Category.objects.create(name='Valves'))
+
+        with mock.patch.object(self.index, '_rebuild', side_effect=AssertionError('rebuilt')):
+            self.assertEqual(self.names('bos'), [])
+            self.assertEqual(self.names('val'), ['Valeo', 'Valves'])
+
+        self.write(self.brand.delete)
+        with mock.patch.object(self.index, '_rebuild', side_effect=AssertionError('rebuilt')):
+            self.assertEqual(self.names('val'), ['Valves'])
+
+    def test_missing_journal_entries_force_a_rebuild(self):
+        self.assertEqual(self.names('bos'), ['Bosch'])
+
+        self.write(self.rename_brand)
+        cache.delete(CHANGE_CACHE_KEY.format(cache.get(VERSION_CACHE_KEY)))
+
+        with mock.patch.object(self.index, '_rebuild', wraps=self.index._rebuild) as rebuild:
+            self.assertEqual(self.names('val'), ['Valeo'])
+        rebuild.assert_called_once()
+
+    def test_evicted_version_never_matches_a_loaded_index(self):
+        # A worker built its index at a small version, then the key was evicted
+        cache.set(VERSION_CACHE_KEY, 1, timeout=None)
+        self.assertEqual(self.names('bos'), ['Bosch'])
+        cache.delete(VERSION_CACHE_KEY)
+
+        self.write(self.rename_brand)
+        self.assertEqual(self.names('val'), ['Valeo'])
+
+    def test_cold_start_builds_in_the_background(self):
+        with mock.patch('Handcarapp.autocomplete.submit') as submit:
+            self.assertEqual(self.names('bos'), [])
+            self.assertEqual(self.names('bo'), [])
+        # One build at a time, off the request path
+        submit.assert_called_once_with(self.index._rebuild)
+
+        self.index._rebuild()
+        self.assertEqual(self.names('bos'), ['Bosch'])
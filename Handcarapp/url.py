@@ -28,6 +28,7 @@ urlpatterns = [
 
     path('add_review/<int:product_id>/', views.add_review, name= 'add_review'),
     path('view_review/<int:product_id>/', views.view_review, name='view_review'),
+    path('product_detail/<int:product_id>/', views.product_detail, name='product_detail'),
 
 
     path('add_category', views.add_category, name='add_category'),
@@ -43,8 +44,14 @@ urlpatterns = [
 
 
     path('add_product', views.add_product, name='add_product'),
+    path('import_products', views.import_products_view, name='import_products'),
+    path('bulk_update_products', views.bulk_update_products, name='bulk_update_products'),
     path('view_products', views.view_products, name='view_products'),
+    path('faceted_products', views.faceted_products, name='faceted_products'),
     path('edit_product/<int:product_id>/', views.edit_product, name='edit_product'),
+    path('image_upload_status/<int:upload_id>/', views.image_upload_status, name='image_upload_status'),
+    path('image_upload_signature', views.image_upload_signature, name='image_upload_signature'),
+    path('attach_uploaded_image', views.attach_uploaded_image, name='attach_uploaded_image'),
     path('delete_product/<int:product_id>/', views.delete_product, name='delete_product'),
 
 
@@ -61,6 +68,7 @@ urlpatterns = [
 
 
     path('search_products', views.search_products, name='search_products'),
+    path('autocomplete', views.autocomplete, name='autocomplete'),
     path('promote_product', views.promote_product, name='promote_product'),
     path('view_promoted_products', views.view_promoted_products, name='view_promoted_products'),
     path('remove_promoted_product', views.remove_promoted_product, name='remove_promoted_product'),
@@ -132,6 +140,7 @@ urlpatterns = [
     path('my_orders', views.my_orders, name='my_orders'),
     path('update_order_status/<str:order_id>/', views.update_order_status, name='update_order_status'),
     path('promoted_brands_products', views.promoted_brands_products, name='promoted_brands_products'),
+    path('home_feed', views.home_feed, name='home_feed'),
     path('get_all_orders', views.get_all_orders, name='get_all_orders'),
     path('get_nearby_vendor_on_add_subscription', views.get_nearby_vendor_on_add_subscription, name='get_nearby_vendor_on_add_subscription'),
     path('get_vendor_subscribers/<int:vendor_id>/', views.get_vendor_subscribers, name='get_vendor_subscribers'),
@@ -148,6 +157,8 @@ urlpatterns = [
     path('get_subscription_status',views.get_subscription_status,name='get_subscription_status'),
     path('delete_subscriber/<int:subscriber_id>/', views.delete_subscriber, name='delete_subscriber'),
     path('edit_subscriber/<int:subscriber_id>/', views.edit_subscriber, name='edit_subscriber'),
+    path('external_http_metrics', views.external_http_metrics, name='external_http_metrics'),
+    path('catalog_cache_stats', views.catalog_cache_stats, name='catalog_cache_stats'),
 
 
 
@@ -1,16 +1,7 @@
-import requests
 import math
-from decouple import config
+from django.db.models import Q
 
-def geocode_address(address):
-    api_key = config('OPENCAGE_API_KEY')
-    url = f'https://api.opencagedata.com/geocode/v1/json?q={address}&key={api_key}'
-    response = requests.get(url).json()
-    if response['results']:
-        latitude = response['results'][0]['geometry']['lat']
-        longitude = response['results'][0]['geometry']['lng']
-        return latitude, longitude
-    return None, None
+from .geocoding import geocode_address
 
 
 
@@ -47,19 +38,133 @@ def get_geocoded_location(address):
     return latitude, longitude
 
 
-def get_nearby_vendors(subscriber_lat, subscriber_lon):
+# Geohash grid used to index vendor coordinates. Services store a full
+# precision hash; nearby searches query the 3x3 block of cells around the
+# user at a precision whose cells are at least as large as the radius.
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0
+MAX_SEARCH_RADIUS_KM = 200
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits, bit_count, even = 0, 0, True
+    while len(geohash) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(geohash)
+
+
+def geohash_cell_size(precision):
+    """Return the (latitude, longitude) size in degrees of a cell at this precision."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, min_lng, max_lng) enclosing the search circle."""
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    lng_delta = 180.0 if cos_lat < 1e-6 else min(180.0, lat_delta / cos_lat)
+    return (
+        max(-90.0, latitude - lat_delta),
+        min(90.0, latitude + lat_delta),
+        max(-180.0, longitude - lng_delta),
+        min(180.0, longitude + lng_delta),
+    )
+
+
+def geohash_cells_for_radius(latitude, longitude, radius_km):
+    """Return the geohash prefixes whose cells cover the search circle."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    lat_delta = max_lat - latitude
+    lng_delta = max_lng - longitude
+
+    # Finest precision whose cells are still larger than the radius, so the
+    # circle never reaches beyond the neighbouring cells.
+    precision = 0
+    for candidate in range(1, GEOHASH_PRECISION + 1):
+        cell_lat, cell_lng = geohash_cell_size(candidate)
+        if cell_lat < lat_delta or cell_lng < lng_delta:
+            break
+        precision = candidate
+    if precision == 0:
+        return []
+
+    cell_lat, cell_lng = geohash_cell_size(precision)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        for lng_step in (-1, 0, 1):
+            lat = min(90.0, max(-90.0, latitude + lat_step * cell_lat))
+            lng = (longitude + lng_step * cell_lng + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(lat, lng, precision))
+    return sorted(cells)
+
+
+def nearby_services_queryset(latitude, longitude, radius_km, queryset=None):
+    """
+    Narrow a Services queryset to rows inside the geohash cells and bounding
+    box around the point. Exact distances still need haversine().
+    """
     from .models import Services
-    vendors = Services.objects.all()
+    if queryset is None:
+        queryset = Services.objects.all()
+
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+    queryset = queryset.filter(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lng, max_lng),
+    )
+
+    cells = geohash_cells_for_radius(latitude, longitude, radius_km)
+    if cells:
+        cell_filter = Q()
+        for cell in cells:
+            cell_filter |= Q(geohash__startswith=cell)
+        queryset = queryset.filter(cell_filter)
+    return queryset
+
+
+def get_nearby_vendors(subscriber_lat, subscriber_lon, radius_km=50, queryset=None):
     nearby = []
-    for vendor in vendors:
-        if vendor.latitude and vendor.longitude:
-            distance = haversine(subscriber_lat, subscriber_lon, vendor.latitude, vendor.longitude)
-            if distance <= 50:
-                vendor.distance = round(distance, 2)
-                nearby.append(vendor)
+    for vendor in nearby_services_queryset(subscriber_lat, subscriber_lon, radius_km, queryset):
+        distance = haversine(subscriber_lat, subscriber_lon, vendor.latitude, vendor.longitude)
+        if distance <= radius_km:
+            vendor.distance = round(distance, 2)
+            nearby.append(vendor)
+    nearby.sort(key=lambda vendor: vendor.distance)
     return nearby
 
 
+def parse_radius(value, default):
+    """Parse a ?radius= query parameter in km, capped at MAX_SEARCH_RADIUS_KM."""
+    if value in (None, ''):
+        return default
+    try:
+        radius = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid radius.")
+    if not 0 < radius <= MAX_SEARCH_RADIUS_KM:
+        raise ValueError(f"Radius must be between 0 and {MAX_SEARCH_RADIUS_KM} km.")
+    return radius
+
+
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib import colors
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .catalog_cache import catalog_version
+from .utils import EARTH_RADIUS_KM
+
+VENDOR_INDEX = 'vendor_index'
+VERSION_CACHE_KEY = f'{VENDOR_INDEX}:version'
+
+
+class VendorCoordinateIndex:
+    """
+    In-process copy of every geocoded vendor's id and coordinates held as
+    contiguous NumPy arrays, so nearest-vendor lookups are one vectorized
+    haversine pass instead of a Python loop over Services rows.
+
+    Each worker process keeps its own copy. Writers call invalidate(), which
+    drops the local copy and bumps a shared version in the cache so the other
+    workers reload on their next lookup; the TTL is a backstop for writes that
+    bypass invalidate().
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'VENDOR_INDEX_TTL', 300)
+        self._lock = threading.Lock()
+        self._ids = None
+        self._lat = None
+        self._lng = None
+        self._cos_lat = None
+        self._version = None
+        self._loaded_at = 0.0
+
+    def _load(self, version):
+        from .models import Services
+        rows = list(
+            Services.objects.filter(latitude__isnull=False, longitude__isnull=False)
+            .values_list('id', 'latitude', 'longitude')
+        )
+        coordinates = np.array([(lat, lng) for _, lat, lng in rows], dtype=np.float64).reshape(-1, 2)
+        self._ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self._lat = np.ascontiguousarray(np.radians(coordinates[:, 0]))
+        self._lng = np.ascontiguousarray(np.radians(coordinates[:, 1]))
+        self._cos_lat = np.cos(self._lat)
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+    def _arrays(self):
+        version = catalog_version(VENDOR_INDEX)
+        with self._lock:
+            expired = time.monotonic() - self._loaded_at > self.ttl
+            if self._ids is None or expired or version != self._version:
+                self._load(version)
+            return self._ids, self._lat, self._lng, self._cos_lat
+
+    def invalidate(self):
+        with self._lock:
+            self._ids = None
+        try:
+            cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            # Evicted: reseed from the clock, never at a version a worker may still hold
+            catalog_version(VENDOR_INDEX)
+
+    def nearest(self, latitude, longitude, radius_km=None, limit=None):
+        """
+        Return [(vendor_id, distance_km), ...] sorted by distance, restricted
+        to radius_km and truncated to the closest `limit` vendors.
+        """
+        ids, lat, lng, cos_lat = self._arrays()
+        if not len(ids):
+            return []
+
+        lat0 = np.radians(latitude)
+        lng0 = np.radians(longitude)
+        a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * cos_lat * np.sin((lng - lng0) / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+        candidates = np.flatnonzero(distances <= radius_km) if radius_km is not None else np.arange(len(ids))
+        if limit is not None and len(candidates) > limit:
+            # Top-k without sorting the whole candidate set
+            candidates = candidates[np.argpartition(distances[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+
+        return [(int(ids[i]), float(distances[i])) for i in candidates]
+
+
+vendor_index = VendorCoordinateIndex()
+
+
+def invalidate_vendor_index():
+    # Other workers must not reload before the write is visible to them
+    transaction.on_commit(vendor_index.invalidate)
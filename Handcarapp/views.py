@@ -17,8 +17,9 @@ from django.core.mail import send_mail
 from django.core.validators import validate_email
 from django.core.paginator import Paginator
 
-from django.db import IntegrityError
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
 from django.http import (
     JsonResponse,
     HttpResponse,
@@ -30,7 +31,6 @@ from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.views.decorators.csrf import csrf_exempt
-from cloudinary.uploader import upload, destroy
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 import re
@@ -56,7 +56,6 @@ from rest_framework_simplejwt.exceptions import TokenError
 
 from twilio.rest import Client
 from geopy.exc import GeocoderTimedOut
-from cloudinary.uploader import upload
 
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
@@ -84,13 +83,30 @@ from .models import (
     ServiceInteractionLog,
     Service_Rating,
     PasswordResetOTP,
+    ProductRatingSummary,
+    ServiceRatingSummary,
+    ImageUpload,
 )
 from .utils import (
-    haversine,
-    geocode_address,
     get_geocoded_location,
     get_nearby_vendors,
+    parse_radius,
 )
+from .vendor_index import vendor_index, invalidate_vendor_index
+from .http_client import http_client
+from .pagination import approximate_count, keyset_paginate, parse_page_params
+from .search import search_product_queryset
+from .product_filters import apply_product_filters, parse_product_filters, product_facets
+from .autocomplete import autocomplete_index
+from .catalog_cache import SERVICE_CATEGORY, cache_catalog_response, cache_stats, conditional_catalog_response
+from .home_feed import HOME_FEED, home_feed_blob
+from .product_detail import product_detail_blob
+from .product_import import detect_format, import_products
+from .product_patch import bulk_patch_products
+from .image_uploads import image_upload_data, queue_image_upload
+from .direct_uploads import attach_upload, signed_upload_params
+from .image_variants import image_variants
+from .list_fields import PRODUCT_LIST_FIELDS, SERVICE_LIST_FIELDS
 
 @csrf_exempt
 def signup(request):
@@ -217,62 +233,62 @@ def login_with_otp(request):
 
 
 @csrf_exempt
+@conditional_catalog_response()
+@cache_catalog_response
 def view_products(request):
     if request.method == 'GET':
-        search_query = request.GET.get('search', '')
-        category = request.GET.get('category', '')
-        brand = request.GET.get('brand', '')
-        min_price = request.GET.get('min_price', '')
-        max_price = request.GET.get('max_price', '')
+        filters = parse_product_filters(request.GET)
         sort_order = request.GET.get('sort', '')  # 'asc' or 'desc'
-        page = int(request.GET.get('page', 1))  #  get current page
-        per_page = int(request.GET.get('limit', 10))  #  default items per page
-
-        products = Product.objects.all()
-
-        # Filters
-        if search_query:
-            products = products.filter(name__icontains=search_query)
-        if category:
-            category_list = [c.strip() for c in category.split(',')]
-            products = products.filter(category__name__in=category_list)
-        if brand:
-            brand_list = [b.strip() for b in brand.split(',')]
-            products = products.filter(brand__name__in=brand_list)
-        if min_price:
-            products = products.filter(price__gte=min_price)
-        if max_price:
-            products = products.filter(price__lte=max_price)
-        if sort_order == 'asc':
-            products = products.order_by('price')
-        elif sort_order == 'desc':
-            products = products.order_by('-price')
+        cursor = request.GET.get('cursor')  # presence (even empty) selects cursor pagination
+        with_total = request.GET.get('with_total') == '1'
+        compact = request.GET.get('compact') == '1'  # one array per field instead of one dict per product
+        try:
+            page, per_page = parse_page_params(request.GET)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid page or limit.'}, status=400)
+        try:
+            fields = PRODUCT_LIST_FIELDS.parse(request.GET.get('fields'))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        products = Product.objects.select_related('category', 'brand', 'rating_summary')
+        products = apply_product_filters(products, filters)
+        # Only the requested fields' columns and joins; effective_price is the sort key
+        products = PRODUCT_LIST_FIELDS.narrow(products, fields, extra_columns=['effective_price'])
+        if cursor is not None:
+            # Keyset pagination for infinite scroll: no COUNT(*) and no OFFSET
+            if sort_order == 'asc':
+                ordering = ['effective_price', 'id']
+            elif sort_order == 'desc':
+                ordering = ['-effective_price', '-id']
+            else:
+                ordering = ['id']
+            try:
+                paginated_products, next_cursor, has_next = keyset_paginate(products, ordering, cursor, per_page)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+        else:
+            if sort_order == 'asc':
+                products = products.order_by('effective_price')
+            elif sort_order == 'desc':
+                products = products.order_by('-effective_price')
 
-        # Apply pagination
-        paginator = Paginator(products, per_page)
-        paginated_products = paginator.get_page(page)
+            # Apply pagination
+            paginator = Paginator(products, per_page)
+            paginated_products = paginator.get_page(page)
 
         # Prepare paginated response
-        data = [
-            {
-                "id": product.id,
-                "name": product.name,
-                "category": product.category.name if product.category else None,
-                "brand": product.brand.name if product.brand else None,
-                "original_price": float(product.price),
-                "discounted_price": float(product.discounted_price),
-                "stock": product.stock,
-                "image": product.image if product.image else None,
-                "description": product.description,
-                "discount_percentage": product.discount_percentage,
-                "is_bestseller": product.is_bestseller,
-                "average_rating": round(
-                    sum(review.rating for review in product.reviews.all()) / product.reviews.count(), 1
-                ) if product.reviews.exists() else 0,
-                "total_reviews": product.reviews.count(),
+        data = PRODUCT_LIST_FIELDS.rows(paginated_products, fields, compact)
+
+        if cursor is not None:
+            response = {
+                "products": data,
+                "next_cursor": next_cursor,
+                "has_next": has_next,
             }
-            for product in paginated_products
-        ]
+            if with_total:
+                response["total"] = approximate_count(products)
+            return JsonResponse(response)
 
         return JsonResponse({
             "products": data,
@@ -285,6 +301,55 @@ def view_products(request):
 
     return JsonResponse({'error': 'Invalid request method'}, status=400)
 
+
+@csrf_exempt
+@conditional_catalog_response()
+@cache_catalog_response
+def faceted_products(request):
+    """view_products page plus category, brand and price-band counts for the same filters."""
+    if request.method == 'GET':
+        filters = parse_product_filters(request.GET)
+        sort_order = request.GET.get('sort', '')
+        try:
+            page, per_page = parse_page_params(request.GET)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid page or limit.'}, status=400)
+        compact = request.GET.get('compact') == '1'
+        try:
+            fields = PRODUCT_LIST_FIELDS.parse(request.GET.get('fields'))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # The facet total doubles as the page count, so no separate COUNT(*)
+        facets = product_facets(filters)
+        total = facets['total']
+
+        products = Product.objects.select_related('category', 'brand', 'rating_summary')
+        products = apply_product_filters(products, filters)
+        products = PRODUCT_LIST_FIELDS.narrow(products, fields)
+        if sort_order == 'asc':
+            products = products.order_by('effective_price', 'id')
+        elif sort_order == 'desc':
+            products = products.order_by('-effective_price', '-id')
+        elif not filters['search']:
+            products = products.order_by('id')
+
+        offset = (page - 1) * per_page
+        data = PRODUCT_LIST_FIELDS.rows(products[offset:offset + per_page], fields, compact)
+        pages = max((total + per_page - 1) // per_page, 1)
+
+        return JsonResponse({
+            "products": data,
+            "facets": {key: value for key, value in facets.items() if key != 'total'},
+            "total": total,
+            "page": page,
+            "pages": pages,
+            "has_next": page < pages,
+            "has_previous": page > 1,
+        })
+
+    return JsonResponse({'error': 'Invalid request method'}, status=405)
+
 # Custom JWT Authentication to handle token from HttpOnly cookies
 
 #
@@ -398,6 +463,7 @@ def get_wishlist_items(request):
                 'product_name': product.name,
                 'product_price': product.price,
                 'product_image': product.image if product.image else None,
+                'product_image_variants': image_variants(product.image),
                 'product_description': product.description,
             })
         
@@ -429,9 +495,9 @@ def filter_by_brand(queryset, brand_id):
 
 def filter_by_aed(queryset, min_price=None, max_price=None):
     if min_price is not None:
-        queryset = queryset.filter(price__gte=min_price)
+        queryset = queryset.filter(effective_price__gte=min_price)
     if max_price is not None:
-        queryset = queryset.filter(price__lte=max_price)
+        queryset = queryset.filter(effective_price__lte=max_price)
     return queryset
 
 def filter_by_new_arrivals(queryset, days=30):
@@ -439,11 +505,16 @@ def filter_by_new_arrivals(queryset, days=30):
     return queryset.filter(created_at__gte=recent_date)
 
 def filter_by_rating(queryset, min_rating):
-    return queryset.filter(rating__gte=min_rating)
+    # Products without reviews have no summary row and count as rated 0
+    if min_rating <= 0:
+        return queryset
+    return queryset.filter(rating_summary__average_rating__gte=min_rating)
 
 @csrf_exempt
 def filter_and_search_products(request):
-    products = Product.objects.all()
+    # The rating comes from the denormalized summary joined into the same query
+    products = Product.objects.select_related('brand').annotate(
+        rating=Coalesce('rating_summary__average_rating', Value(0.0)))
 
     # Get filter parameters
     search_query = request.GET.get('search')
@@ -454,10 +525,15 @@ def filter_and_search_products(request):
     min_rating = request.GET.get('min_rating')
     new_arrivals = request.GET.get('new_arrivals')
     sort_by = request.GET.get('sort_by')
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        per_page = max(int(request.GET.get('limit', 10)), 1)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid page or limit.'}, status=400)
 
-    # Apply search by name
+    # Apply full-text search, ranked by relevance unless sort_by is given
     if search_query:
-        products = products.filter(name__icontains=search_query)
+        products = search_product_queryset(products, search_query)
 
     # Apply filters safely
     if category_id and category_id.isdigit():
@@ -486,23 +562,35 @@ def filter_and_search_products(request):
 
     # Apply sorting if provided
     if sort_by in ['price', '-price', 'rating', '-rating', 'created_at', '-created_at']:
-        products = products.order_by(sort_by)
+        # Price sorts use the discounted price customers pay; id keeps pages stable on ties
+        products = products.order_by(sort_by.replace('price', 'effective_price'), 'id')
+    elif not products.ordered:
+        products = products.order_by('id')
+
+    paginator = Paginator(products, per_page)
+    paginated_products = paginator.get_page(page)
 
-    # Prepare response - Fixed potential attribute errors
     product_data = []
-    for product in products:
+    for product in paginated_products:
         product_info = {
             'id': product.id,
             'name': product.name,
             'price': product.price,
             'brand': product.brand.name if product.brand else None,
-            'image_url': product.image.url if product.image and hasattr(product.image, 'url') else None,
+            'image_url': product.image or None,
             'description': product.description,
-            'rating': product.rating,
+            'rating': round(product.rating, 1),
         }
         product_data.append(product_info)
 
-    return JsonResponse({'products': product_data})
+    return JsonResponse({
+        'products': product_data,
+        'total': paginator.count,
+        'page': paginated_products.number,
+        'pages': paginator.num_pages,
+        'has_next': paginated_products.has_next(),
+        'has_previous': paginated_products.has_previous(),
+    })
 
 
 logger = logging.getLogger(__name__)
@@ -551,6 +639,7 @@ class DisplayCartView(APIView):
                 'cart_item_id': item.id,
                 'product_id': item.product.id,
                 'product_image': item.product.image,
+                'product_image_variants': image_variants(item.product.image),
                 'product_name': item.product.name,
                 'product_price': item.product.price,
                 'quantity': item.quantity,
@@ -676,14 +765,16 @@ def add_review(request, product_id):
         if comment and not isinstance(comment, str):
             return JsonResponse({'error': 'Comment must be a string.'}, status=400)
 
-        # Attempt to create a new review
+        # Attempt to create a new review and fold it into the product's rating summary
         try:
-            review = Review.objects.create(
-                product=product,
-                user=request.user,
-                rating=rating,
-                comment=comment
-            )
+            with transaction.atomic():
+                review = Review.objects.create(
+                    product=product,
+                    user=request.user,
+                    rating=rating,
+                    comment=comment
+                )
+                ProductRatingSummary.record_review(review)
             return JsonResponse({'message': 'Review added successfully.', 'review_id': review.id}, status=201)
 
         except IntegrityError:
@@ -713,6 +804,18 @@ def view_review(request, product_id):
     else:
         return JsonResponse({'error': 'Invalid HTTP method.'}, status=405)
 
+
+@csrf_exempt
+def product_detail(request, product_id):
+    """Product, category, brand, rating summary and newest reviews in one cached response."""
+    if request.method == 'GET':
+        blob = product_detail_blob(product_id)
+        if blob is None:
+            return JsonResponse({'error': 'Product not found'}, status=404)
+        return HttpResponse(blob, content_type='application/json')
+    return JsonResponse({'error': 'Invalid request method'}, status=405)
+
+
 @csrf_exempt
 def add_category(request):
     if request.method == 'POST':
@@ -746,6 +849,8 @@ def add_category(request):
     return JsonResponse({"error": "Invalid HTTP method"}, status=405)
 
 
+@conditional_catalog_response()
+@cache_catalog_response
 def view_categories(request):
     if request.method == 'GET':
         search_query = request.GET.get('search', '')
@@ -811,6 +916,44 @@ def delete_category(request, category_id):
         return JsonResponse({"error": "Invalid HTTP method"}, status=405)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def import_products_view(request):
+    """Bulk import products from an uploaded CSV or NDJSON file ('file'), streamed row by row."""
+    upload_file = request.FILES.get('file')
+    if not upload_file:
+        return Response({'error': 'A CSV or NDJSON file is required.'}, status=400)
+
+    file_format = request.data.get('format') or detect_format(upload_file.name)
+    if file_format not in ('csv', 'ndjson'):
+        return Response({'error': "Unsupported format. Use 'csv' or 'ndjson'."}, status=400)
+    try:
+        chunk_size = int(request.data['chunk_size']) if request.data.get('chunk_size') else None
+    except ValueError:
+        return Response({'error': 'chunk_size must be an integer.'}, status=400)
+
+    try:
+        report = import_products(upload_file.file, file_format, chunk_size)
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+    return Response(report, status=200)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def bulk_update_products(request):
+    """Patch price, discount, stock and promotion flags of many products in one transaction."""
+    items = request.data.get('products') if isinstance(request.data, dict) else request.data
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'A non-empty list of products is required.'}, status=400)
+
+    try:
+        report = bulk_patch_products(items)
+    except Exception as e:
+        return Response({'error': str(e)}, status=500)
+    return Response(report, status=400 if report['errors'] else 200)
+
+
 @csrf_exempt
 def add_brand(request):
     if request.method == 'POST':
@@ -843,6 +986,8 @@ def add_brand(request):
     return JsonResponse({"error": "Invalid HTTP method"}, status=405)
 
 
+@conditional_catalog_response()
+@cache_catalog_response
 def view_brand(request):
     if request.method == 'GET':
         search_query = request.GET.get('search', '')
@@ -954,15 +1099,6 @@ def add_product(request):
             category = get_object_or_404(Category, name=category_name)
             brand = get_object_or_404(Brand, name=brand_name)
 
-            # Handle image upload to Cloudinary
-            image_url = None
-            if image_file:
-                try:
-                    upload_result = upload(image_file, folder="product_images/")
-                    image_url = upload_result['secure_url']
-                except Exception as e:
-                    return JsonResponse({"error": f"Image upload failed: {str(e)}"}, status=500)
-
             # Create the Product instance with validated/converted values
             product = Product.objects.create(
                 name=name,
@@ -973,11 +1109,19 @@ def add_product(request):
                 stock=stock,
                 is_bestseller=is_bestseller,
                 discount_percentage=discount_percentage,
-                image=image_url
+                image=None
             )
 
+            # The image is uploaded to Cloudinary in the background and set on
+            # the product when done; poll image_upload_status for progress
+            image_upload = None
+            if image_file:
+                image_upload = queue_image_upload(
+                    image_file, ImageUpload.TARGET_PRODUCT, product.id, folder="product_images/")
+
             return JsonResponse({
                 "message": "Product added successfully.",
+                "image_upload": image_upload_data(image_upload) if image_upload else None,
                 "product": {
                     "id": product.id,
                     "name": product.name,
@@ -1076,26 +1220,6 @@ def edit_product(request, product_id):
             product = get_object_or_404(Product, id=product_id)
 
             image_file = request.FILES.get('image', None)
-            image_url = product.image  # Default to current image
-
-            # If a new image is uploaded
-            if image_file:
-                # Delete the old image from Cloudinary
-                if product.image:
-                    try:
-                        match = re.search(r'product_images/([^\.]+)', product.image)
-                        if match:
-                            public_id = f"product_images/{match.group(1)}"
-                            destroy(public_id)
-                    except Exception as e:
-                        return JsonResponse({"error": f"Failed to delete old image: {str(e)}"}, status=500)
-
-                # Upload new image to Cloudinary
-                try:
-                    upload_result = upload(image_file, folder="product_images/")
-                    image_url = upload_result['secure_url']
-                except Exception as e:
-                    return JsonResponse({"error": f"Image upload failed: {str(e)}"}, status=500)
 
             # Get form data
             name = request.POST.get('name', product.name)
@@ -1123,11 +1247,18 @@ def edit_product(request, product_id):
             product.description = description
             product.is_bestseller = is_bestseller
             product.discount_percentage = discount_percentage
-            product.image = image_url
             product.save()
 
+            # A new image replaces the current one (which is then deleted from
+            # Cloudinary) once the background upload finishes
+            image_upload = None
+            if image_file:
+                image_upload = queue_image_upload(
+                    image_file, ImageUpload.TARGET_PRODUCT, product.id, folder="product_images/")
+
             return JsonResponse({
                 "message": "Product updated successfully.",
+                "image_upload": image_upload_data(image_upload) if image_upload else None,
                 "product": {
                     "id": product.id,
                     "name": product.name,
@@ -1149,6 +1280,68 @@ def edit_product(request, product_id):
     return JsonResponse({"error": "Invalid HTTP method."}, status=405)
 
 
+@csrf_exempt
+def image_upload_status(request, upload_id):
+    """Progress of a background image upload queued by add_product, edit_product or edit_vendor_profile."""
+    if request.method == 'GET':
+        image_upload = get_object_or_404(ImageUpload, id=upload_id)
+        return JsonResponse(image_upload_data(image_upload), status=200)
+
+    return JsonResponse({"error": "Invalid HTTP method."}, status=405)
+
+
+@csrf_exempt
+def image_upload_signature(request):
+    """
+    Signed parameters for uploading a product or vendor image straight to
+    Cloudinary, so the bytes never pass through this server. Send the upload
+    result to attach_uploaded_image afterwards.
+    """
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            target = data.get('target')
+            target_id = data.get('target_id')
+            target_models = {ImageUpload.TARGET_PRODUCT: Product, ImageUpload.TARGET_SERVICE: Services}
+            if target not in target_models or not target_id:
+                return JsonResponse({"error": "target ('product' or 'service') and target_id are required."}, status=400)
+            target_object = target_models[target].objects.filter(id=target_id).first()
+            if target_object is None:
+                return JsonResponse({"error": f"{target.capitalize()} not found."}, status=404)
+            return JsonResponse(signed_upload_params(target, target_object.id), status=200)
+
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON format."}, status=400)
+        except ValueError:
+            return JsonResponse({"error": "target_id must be an integer."}, status=400)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+    return JsonResponse({"error": "Invalid HTTP method."}, status=405)
+
+
+@csrf_exempt
+def attach_uploaded_image(request):
+    """Attach an image uploaded directly to Cloudinary with image_upload_signature's parameters."""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            if not all(data.get(key) for key in ('upload_token', 'public_id', 'version', 'signature')):
+                return JsonResponse({"error": "upload_token, public_id, version and signature are required."}, status=400)
+            image_upload = attach_upload(
+                data['upload_token'], data['public_id'], data['version'], data['signature'], data.get('format'))
+            return JsonResponse(image_upload_data(image_upload), status=200)
+
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON format."}, status=400)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+    return JsonResponse({"error": "Invalid HTTP method."}, status=405)
+
+
 @csrf_exempt
 def delete_product(request, product_id):
     if request.method == 'DELETE':
@@ -1388,6 +1581,8 @@ def add_plan(request):
 
 
 @csrf_exempt
+@conditional_catalog_response()
+@cache_catalog_response
 def view_plans(request):
     if request.method == 'GET':
         search_query = request.GET.get('search', '')
@@ -1499,7 +1694,7 @@ def delete_plan(request, plan_id):
 @csrf_exempt
 def search_products(request):
     query = request.GET.get('query', '')  # Get the search query from the request
-    products = Product.objects.filter(name__icontains=query)  # Filter products by name
+    products = search_product_queryset(Product.objects.select_related('category', 'brand'), query)  # Ranked full-text search
     # You can add more filters like category or brand here
     results = [
         {
@@ -1515,6 +1710,18 @@ def search_products(request):
     return JsonResponse({"products": results})
 
 
+@csrf_exempt
+def autocomplete(request):
+    if request.method == 'GET':
+        query = request.GET.get('q', '')
+        try:
+            limit = min(int(request.GET.get('limit', 10)), 50)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid limit.'}, status=400)
+        return JsonResponse({"suggestions": autocomplete_index.suggest(query, limit)})
+    return JsonResponse({'error': 'Invalid request method'}, status=405)
+
+
 @csrf_exempt
 def promote_product(request):
     if request.method == 'POST':
@@ -1527,6 +1734,8 @@ def promote_product(request):
     return JsonResponse({"error": "Invalid request method"}, status=400)
 
 
+@conditional_catalog_response()
+@cache_catalog_response
 def view_promoted_products(request):
     if request.method == 'GET':
         promoted_products = Product.objects.filter(promoted=True)
@@ -1607,6 +1816,8 @@ def promote_brand(request):
     return JsonResponse({"error": "Invalid request method"}, status=400)
 
 
+@conditional_catalog_response()
+@cache_catalog_response
 def view_promoted_brands(request):
     if request.method == 'GET':
         # Filter products where promoted is True
@@ -1626,6 +1837,14 @@ def view_promoted_brands(request):
     return JsonResponse({"error": "Invalid request method"}, status=400)
 
 
+@conditional_catalog_response(HOME_FEED)
+def home_feed(request):
+    """Promoted products, promoted brands and promoted brands' products in one response."""
+    if request.method == 'GET':
+        return HttpResponse(home_feed_blob(), content_type='application/json')
+    return JsonResponse({"error": "Invalid request method"}, status=405)
+
+
 @csrf_exempt
 def remove_promoted_brand(request):
     if request.method == 'POST':
@@ -1698,9 +1917,6 @@ def add_subscriber(request):
         except ValueError:
             return Response({'error': 'Invalid vendor ID in assigned_vendors.'}, status=400)
 
-        subscriber_lat, subscriber_lon = get_geocoded_location(address)
-
-
         if Subscriber.objects.filter(user=user).exists():
             return Response({'error': 'Subscriber already exists for this user.'}, status=400)
 
@@ -1712,8 +1928,6 @@ def add_subscriber(request):
             plan=plan,
             duration=duration,
             start_date=start_date,
-            latitude=subscriber_lat,
-            longitude=subscriber_lon,
         )
 
         vendors = Services.objects.filter(id__in=assigned_vendor_ids)
@@ -2421,6 +2635,7 @@ def add_service_category(request):
     return JsonResponse({"error": "Invalid HTTP method."}, status=405)
 
 
+@conditional_catalog_response(SERVICE_CATEGORY)
 def view_service_categories_user(request):
     try:
         # Retrieve all service categories from the database
@@ -2450,11 +2665,23 @@ def view_service_user(request):
     except (TypeError, ValueError):
         return JsonResponse({"error": "Invalid Latitude or Longitude."}, status=400)
 
-    radius = 20
+    try:
+        radius = parse_radius(request.GET.get('radius'), default=20)
+        limit = int(request.GET.get('limit')) if request.GET.get('limit') else None
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if limit is not None and limit <= 0:
+        return JsonResponse({"error": "Invalid limit."}, status=400)
+    compact = request.GET.get('compact') == '1'  # one array per field instead of one dict per service
+    try:
+        fields = SERVICE_LIST_FIELDS.parse(request.GET.get('fields'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
     nearby_services = []
 
     search_query = request.GET.get('service', "").strip()
-    services = Services.objects.all()
+    services = Services.objects.select_related('service_category', 'rating_summary').prefetch_related('images')
 
     # 🔍 Apply search filter on vendor_name or address
     if search_query:
@@ -2463,36 +2690,24 @@ def view_service_user(request):
             Q(vendor_name__icontains=search_query)
         )
 
-    def get_service_data(service, distance=None):
-        ratings = service.ratings.all()
-        avg_rating = round(sum(r.rating for r in ratings) / ratings.count(), 1) if ratings.exists() else 0
-        return {
-            "id": service.id,
-            "vendor_name": service.vendor_name,
-            "phone_number": service.phone_number,
-            "whatsapp_number": service.whatsapp_number,
-            "service_category": service.service_category.name if service.service_category else None,
-            "service_details": service.service_details,
-            "address": service.address,
-            "rate": service.rate,
-            "images": [image.image.url for image in service.images.all()],
-            "average_rating": avg_rating,
-            "total_reviews": ratings.count(),
-            **({"distance": round(distance, 2)} if distance is not None else {})
-        }
+    services = SERVICE_LIST_FIELDS.narrow(services, fields)
 
     if user_lat is not None and user_lng is not None:
-        for service in services:
-            if service.latitude is not None and service.longitude is not None:
-                distance = haversine(user_lat, user_lng, service.latitude, service.longitude)
-                if distance <= radius:
-                    nearby_services.append(get_service_data(service, distance))
+        # Distances come from the in-memory vendor index; only the matching rows are fetched.
+        # With a search filter the closest-k cut has to happen after filtering.
+        hits = vendor_index.nearest(user_lat, user_lng, radius, None if search_query else limit)
+        distances = dict(hits)
+        matched = services.filter(id__in=list(distances))
+        for service in sorted(matched, key=lambda service: distances[service.id])[:limit]:
+            service.distance = distances[service.id]
+            nearby_services.append(service)
+        if nearby_services and not request.GET.get('fields'):
+            fields.append('distance')
 
     if not user_lat or not user_lng or not nearby_services:
-        for service in services:
-            nearby_services.append(get_service_data(service))
+        nearby_services = list(services)
 
-    return JsonResponse({'services': nearby_services}, status=200)
+    return JsonResponse({'services': SERVICE_LIST_FIELDS.rows(nearby_services, fields, compact)}, status=200)
 
 
 @csrf_exempt
@@ -2787,9 +3002,11 @@ def add_service_rating(request):
         if existing_rating:
             return JsonResponse({"error": "You have already rated this service."}, status=400)
 
-        # Create the new rating
-        new_rating = Service_Rating(service=service, user=user, rating=rating_value, comment=comment)
-        new_rating.save()
+        # Create the new rating and fold it into the service's rating summary
+        with transaction.atomic():
+            new_rating = Service_Rating(service=service, user=user, rating=int(rating_value), comment=comment)
+            new_rating.save()
+            ServiceRatingSummary.record_rating(new_rating)
 
         return JsonResponse({"message": "Rating added successfully."}, status=201)
 
@@ -2809,7 +3026,7 @@ def view_service_rating(request):
             return JsonResponse({"error": "Service ID is required."}, status=400)
 
         # Filter ratings by the provided service ID
-        service_ratings = Service_Rating.objects.filter(service_id=service_id)
+        service_ratings = Service_Rating.objects.filter(service_id=service_id).select_related('service', 'user')
 
         # Check if there are any ratings for the given service ID
         if not service_ratings.exists():
@@ -2829,8 +3046,15 @@ def view_service_rating(request):
             }
             ratings_data.append(rating_data)  # Append each rating to the list
 
+        summary = ServiceRatingSummary.objects.filter(service_id=service_id).first()
+
         # Return the ratings data as JSON
-        return JsonResponse({"Ratings": ratings_data}, status=200)
+        return JsonResponse({
+            "Ratings": ratings_data,
+            "average_rating": round(summary.average_rating, 1) if summary else 0,
+            "total_reviews": summary.review_count if summary else 0,
+            "rating_histogram": summary.histogram() if summary else ServiceRatingSummary.empty_histogram(),
+        }, status=200)
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -2843,24 +3067,30 @@ def get_nearby_services(request):
     except (TypeError, ValueError):
         return JsonResponse({"error": "Invalid Latitude or Longitude."}, status=400)
 
-    radius = 20  # Define the search radius in kilometers
+    try:
+        radius = parse_radius(request.GET.get('radius'), default=20)  # Search radius in kilometers
+        limit = int(request.GET.get('limit')) if request.GET.get('limit') else None
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if limit is not None and limit <= 0:
+        return JsonResponse({"error": "Invalid limit."}, status=400)
 
     nearby_services = []
 
-    # Loop through all services and check if they are within the radius
-    for service in Services.objects.all():
-        # Ensure service has valid latitude and longitude before calculating distance
-        if service.latitude is not None and service.longitude is not None:
-            # Calculate the distance only if both latitude and longitude are available
-            distance = haversine(user_lat, user_lng, service.latitude, service.longitude)
-
-            if distance <= radius:
-                nearby_services.append({
-                    'name': service.vendor_name,
-                    'latitude': service.latitude,
-                    'longitude': service.longitude,
-                    'distance': round(distance, 2)  # Include the distance
-                })
+    # Distances are computed over the in-memory vendor index in one vectorized pass
+    hits = vendor_index.nearest(user_lat, user_lng, radius, limit)
+    services = Services.objects.only('vendor_name', 'latitude', 'longitude').in_bulk([vendor_id for vendor_id, _ in hits])
+
+    for vendor_id, distance in hits:
+        service = services.get(vendor_id)
+        if service is None:
+            continue  # Deleted since the index was loaded
+        nearby_services.append({
+            'name': service.vendor_name,
+            'latitude': service.latitude,
+            'longitude': service.longitude,
+            'distance': round(distance, 2)  # Include the distance
+        })
 
     return JsonResponse({'services': nearby_services}, status=200)
 
@@ -3080,8 +3310,6 @@ def edit_vendor_profile(request, vendor_id):
             if new_address and new_address != vendor.address:
                 vendor.address = new_address
                 print(f"New address set: {new_address}")
-                vendor.latitude, vendor.longitude = geocode_address(new_address)
-                print(f"Geocoded latitude: {vendor.latitude}, longitude: {vendor.longitude}")
             vendor.service_details = data.get('service_details', vendor.service_details)
             vendor.rate = data.get('rate', vendor.rate)
             service_category_name = data.get('service_category')
@@ -3093,16 +3321,16 @@ def edit_vendor_profile(request, vendor_id):
                     return JsonResponse({"error": "Invalid service category name."}, status=400)
             vendor.save()
 
-            if 'images' in request.FILES:
-                uploaded_images = request.FILES.getlist('images')  # Get the uploaded files
-                for image in uploaded_images:
-                    # Upload each image to Cloudinary
-                    cloudinary_response = upload(image)
-                    image_url = cloudinary_response['secure_url']  # Get the secure URL from the response
-
-                    # Save the image URL in the ServiceImage model
-                    ServiceImage.objects.create(service=vendor, image=image_url)
-            return JsonResponse({"message": "Vendor updated successfully."}, status=200)
+            # Images are uploaded to Cloudinary in parallel in the background and
+            # added to the vendor's ServiceImages as each one finishes
+            image_uploads = [
+                queue_image_upload(image, ImageUpload.TARGET_SERVICE, vendor.id)
+                for image in request.FILES.getlist('images')
+            ]
+            return JsonResponse({
+                "message": "Vendor updated successfully.",
+                "image_uploads": [image_upload_data(image_upload) for image_upload in image_uploads],
+            }, status=200)
 
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=500)
@@ -3121,6 +3349,7 @@ def delete_service_by_admin(request, service_id):
 
             # Delete the service
             service.delete()
+            invalidate_vendor_index()
 
             return JsonResponse({"message": "Service deleted successfully."}, status=200)
 
@@ -3137,6 +3366,7 @@ def delete_service_by_admin(request, service_id):
 @csrf_exempt
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
+@conditional_catalog_response(SERVICE_CATEGORY)
 def view_service_category(request):
     try:
         # Retrieve all categories
@@ -3618,6 +3848,8 @@ def update_order_status(request, order_id):
 
 from django.db.models import Max
 
+@conditional_catalog_response()
+@cache_catalog_response
 @api_view(['GET'])
 def promoted_brands_products(request):
     promoted_brands = Brand.objects.filter(promoted=True)
@@ -3710,8 +3942,13 @@ def get_nearby_vendor_on_add_subscription(request):
             if not address:
                 return JsonResponse({'error': 'Address is required for geocoding.'}, status=400)
 
+            try:
+                radius = parse_radius(data.get('radius'), default=50)
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
             subscriber_lat, subscriber_lon = get_geocoded_location(address)
-            nearby_vendors = get_nearby_vendors(subscriber_lat, subscriber_lon)
+            nearby_vendors = get_nearby_vendors(subscriber_lat, subscriber_lon, radius)
 
             vendor_data = [
                 {
@@ -3851,19 +4088,16 @@ def vendor_dashboard(request, vendor_id):
 @api_view(['GET'])
 def service_average_rating(request, service_id):
     try:
-        service = get_object_or_404(Services, id=service_id)
-        ratings = service.ratings.all()  # related_name = 'ratings' is used here
-
-        if ratings.exists():
-            avg_rating = round(sum(r.rating for r in ratings) / ratings.count(), 1)
-        else:
-            avg_rating = 0
+        service = get_object_or_404(Services.objects.select_related('rating_summary'), id=service_id)
+        summary = getattr(service, 'rating_summary', None)
 
         return JsonResponse({
             'service_id': service.id,
             'vendor_name': service.vendor_name,
-            'average_rating': avg_rating,
-            'total_reviews': ratings.count()
+            'average_rating': service.average_rating(),
+            'total_reviews': service.total_reviews(),
+            'rating_histogram': summary.histogram() if summary else ServiceRatingSummary.empty_histogram(),
+            'last_rated_at': summary.last_rated_at if summary else None,
         }, status=200)
 
     except Exception as e:
@@ -3873,13 +4107,13 @@ def service_average_rating(request, service_id):
 @api_view(['GET'])
 def product_average_rating(request, product_id):
     try:
-        product = get_object_or_404(Product, id=product_id)
-        reviews = product.reviews.all()
-        if reviews.exists():
-            avg_rating = round(sum(review.rating for review in reviews) / reviews.count(), 1)
-        else:
-            avg_rating = 0
-        return JsonResponse({'product_id': product.id, 'average_rating': avg_rating})
+        product = get_object_or_404(Product.objects.select_related('rating_summary'), id=product_id)
+        return JsonResponse({
+            'product_id': product.id,
+            'average_rating': product.average_rating(),
+            'total_reviews': product.total_reviews(),
+            'rating_histogram': product.rating_histogram(),
+        })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -4157,12 +4391,6 @@ def edit_subscriber(request, subscriber_id):
 
         if address:
             subscriber.address = address
-            try:
-                lat, lon = get_geocoded_location(address)
-                subscriber.latitude = lat
-                subscriber.longitude = lon
-            except Exception as e:
-                return Response({'error': f'Geocoding failed: {e}'}, status=400)
 
         if service_type:
             subscriber.service_type = service_type
@@ -4190,3 +4418,15 @@ def edit_subscriber(request, subscriber_id):
         return Response({'message': 'Subscriber updated successfully.'}, status=200)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def external_http_metrics(request):
+    """Per-host call counts, latency percentiles and circuit state for outbound HTTP calls made by this worker."""
+    return Response({'hosts': http_client.metrics()}, status=200)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def catalog_cache_stats(request):
+    """Hit/miss counts of the catalog response cache for this worker."""
+    return Response({'endpoints': cache_stats.snapshot()}, status=200)